@@ -0,0 +1,73 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : benchmark_ann.py                               #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : comparar recall/latência do índice IVF com a   #
+#             busca exata da galeria                         #
+# -----------------------------------------------------------#
+#USO
+
+#python benchmark_ann.py
+#python benchmark_ann.py 100000
+
+# A galeria é sintética: cada usuário tem um "centro" aleatório e algumas
+# codificações ao redor dele, imitando várias fotos da mesma pessoa.
+# As consultas são novas amostras ao redor de usuários sorteados.
+
+import sys
+import time
+import numpy as np
+from galeria import build_gallery, match_faces
+from indice_ann import build_index
+
+
+# Função que gera usuários sintéticos no mesmo formato do encodings.pkl.
+def synthetic_users(num_users, encodings_per_user=3, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0.0, 0.1, size=(num_users, 128)).astype(np.float32)
+    users = []
+    for i, center in enumerate(centers):
+        encodings = center + rng.normal(0.0, 0.02, size=(encodings_per_user, 128))
+        users.append({'name': f'user_{i}', 'audio': '', 'item': '4', 'encodings': encodings.tolist()})
+    return users, centers
+
+
+# Função que mede o tempo médio (ms) por rosto e devolve também os usuários encontrados.
+def timed_search(search, queries, batch=1):
+    found = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        found.extend(search(queries[i:i + batch]))
+    elapsed = time.perf_counter() - start
+    return found, 1000.0 * elapsed / len(queries)
+
+
+def run_benchmark(num_users=20000, num_queries=500, nprobes=(1, 4, 8, 16, 32)):
+    users, centers = synthetic_users(num_users)
+    rng = np.random.default_rng(1)
+    targets = rng.integers(0, num_users, size=num_queries)
+    queries = (centers[targets] + rng.normal(0.0, 0.02, size=(num_queries, 128))).astype(np.float32)
+
+    start = time.perf_counter()
+    exact_gallery = build_gallery(users, ann_min_size=None)
+    print(f"Galeria: {num_users} usuários, {len(exact_gallery['encodings'])} codificações "
+          f"(montagem {time.perf_counter() - start:.2f} s)")
+
+    exact, exact_ms = timed_search(lambda q: [user['name'] if user else None for user, _ in match_faces(exact_gallery, q)], queries)
+    print(f"{'busca exata':>20}: {exact_ms:8.3f} ms/rosto")
+
+    start = time.perf_counter()
+    index = build_index(exact_gallery['encodings'], exact_gallery['owners'], use_faiss=False)
+    print(f"Índice IVF: nlist={index.nlist} (treino {time.perf_counter() - start:.2f} s)")
+
+    for nprobe in nprobes:
+        index.nprobe = nprobe
+        found, ann_ms = timed_search(lambda q: [users[i]['name'] if i >= 0 else None for i in index.search(q)[1][:, 0]], queries)
+        recall = np.mean([a == b for a, b in zip(found, exact)])
+        print(f"{'IVF nprobe=' + str(nprobe):>20}: {ann_ms:8.3f} ms/rosto  recall@1={recall:.3f}  "
+              f"speedup={exact_ms / ann_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,63 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : benchmark_codificacao.py                       #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : latência do encoding de 1 a 8 rostos por       #
+#             frame, em série e em paralelo                  #
+# -----------------------------------------------------------#
+#USO
+
+#python benchmark_codificacao.py
+#python benchmark_codificacao.py dataset/foto.jpg 4
+
+# Com uma foto, o rosto encontrado nela é repetido N vezes (N rostos no
+# "frame"); sem foto, usa recortes de ruído (o tempo do encoding do dlib não
+# depende do conteúdo). Compara o encoding em série (encode_face_chips) com
+# o ChipEncoder em threads e em processos.
+
+import sys
+import time
+import cv2
+import numpy as np
+import face_recognition
+from codificacao import CHIP_SIZE, ChipEncoder, encode_face_chips, extract_face_chips
+
+REPEATS = 5
+
+
+# Função que monta o recorte usado como rosto no benchmark.
+def sample_chip(photo=None):
+    if photo:
+        image = cv2.imread(photo)
+        boxes = face_recognition.face_locations(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if boxes:
+            return extract_face_chips(image, boxes[:1])[0]
+        print(f"Nenhum rosto em {photo}; usando ruído.")
+    return np.random.default_rng(0).integers(0, 256, (CHIP_SIZE, CHIP_SIZE, 3), dtype=np.uint8)
+
+
+# Função que mede a latência média (ms) para codificar os recortes de um frame.
+def timed_encode(encode, chips):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        encode(chips)
+    return 1000.0 * (time.perf_counter() - start) / REPEATS
+
+
+def run_benchmark(photo=None, workers=None, max_faces=8):
+    chip = sample_chip(photo)
+    encoders = [('threads', ChipEncoder(workers, use_processes=False)), ('processos', ChipEncoder(workers))]
+    print(f"Workers: {encoders[1][1].workers}")
+    print(f"{'rostos':>6} {'série (ms)':>12} " + " ".join(f"{name + ' (ms)':>16}" for name, _ in encoders))
+    for faces in range(1, max_faces + 1):
+        chips = np.repeat(chip[np.newaxis], faces, axis=0)
+        serial_ms = timed_encode(encode_face_chips, chips)
+        parallel = [timed_encode(encoder.encode, chips) for _, encoder in encoders]
+        print(f"{faces:>6} {serial_ms:>12.1f} " + " ".join(f"{ms:>9.1f} ({serial_ms / ms:3.1f}x)" for ms in parallel))
+    for _, encoder in encoders:
+        encoder.close()
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else None)
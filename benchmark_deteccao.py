@@ -0,0 +1,88 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : benchmark_deteccao.py                          #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : comparar recall/latência da cascata Haar+HOG   #
+#             com o HOG no frame inteiro                     #
+# -----------------------------------------------------------#
+#USO
+
+#python benchmark_deteccao.py gravacao_porta.mp4
+#python benchmark_deteccao.py dataset/ 0.5
+
+# Entrada: um vídeo (ou câmera, ex.: 0) ou uma pasta de imagens. Cada frame é
+# reduzido por resize_scale, como no rec_facial_fast_v5.py. O HOG no frame
+# inteiro é a referência: recall = fração dos rostos dele que a cascata
+# também encontrou (IoU >= 0.5).
+
+import os
+import sys
+import time
+import cv2
+import face_recognition
+from deteccao import HaarHogDetector
+from rastreador import box_iou
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+# Função que lê os frames de um vídeo/câmera ou de uma pasta de imagens.
+def read_frames(source, max_frames=300):
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names[:max_frames]:
+            image = cv2.imread(os.path.join(source, name))
+            if image is not None:
+                yield image
+        return
+    video_capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    for _ in range(max_frames):
+        ret, frame = video_capture.read()
+        if not ret:
+            break
+        yield frame
+    video_capture.release()
+
+
+def run_benchmark(source, resize_scale=0.5):
+    detector = HaarHogDetector()
+    frames = reference_faces = found_faces = extra_faces = 0
+    hog_seconds = cascade_seconds = 0.0
+
+    for frame in read_frames(source):
+        small_frame = cv2.resize(frame, (0, 0), fx=resize_scale, fy=resize_scale)
+        rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+        start = time.perf_counter()
+        reference = face_recognition.face_locations(rgb_frame, model="hog")
+        hog_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        boxes = detector.detect(rgb_frame)
+        cascade_seconds += time.perf_counter() - start
+
+        frames += 1
+        reference_faces += len(reference)
+        matched = sum(any(box_iou(face, box) >= 0.5 for box in boxes) for face in reference)
+        found_faces += matched
+        extra_faces += max(0, len(boxes) - matched)
+
+    if not frames:
+        print(f"Nenhum frame lido de {source}")
+        return
+    stats = detector.stats
+    print(f"Frames: {frames}  rostos (HOG no frame inteiro): {reference_faces}")
+    print(f"{'HOG frame inteiro':>20}: {1000.0 * hog_seconds / frames:8.1f} ms/frame")
+    print(f"{'Haar + HOG':>20}: {1000.0 * cascade_seconds / frames:8.1f} ms/frame  "
+          f"recall={found_faces / max(1, reference_faces):.3f}  caixas extras={extra_faces}  "
+          f"speedup={hog_seconds / max(cascade_seconds, 1e-9):.1f}x")
+    print(f"Propostas Haar: {stats['proposals']}  recortes: {stats['crops']}  "
+          f"pixels no HOG: {stats['hog_pixels'] / max(1, stats['frame_pixels']):.1%} do frame")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python benchmark_deteccao.py <vídeo|câmera|pasta> [resize_scale]")
+        sys.exit(1)
+    run_benchmark(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 0.5)
@@ -0,0 +1,96 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : benchmark_galeria.py                           #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : medir a busca da galeria (varredura completa,  #
+#             poda por centróide/raio e quantização)         #
+# -----------------------------------------------------------#
+#USO
+
+#python benchmark_galeria.py
+#python benchmark_galeria.py 5000
+#python benchmark_galeria.py /home/felipe/encodings.pkl
+#python benchmark_galeria.py /home/felipe/encodings.gal
+
+import sys
+import time
+import numpy as np
+from galeria import build_gallery, match_faces
+from quantizacao import quantized_nbytes
+from formato_galeria import load_users as load_gallery_users
+from benchmark_ann import synthetic_users
+
+
+# Função que carrega os usuários de um encodings.pkl/.gal ou gera uma galeria sintética.
+def load_users(argument):
+    if argument.endswith(('.pkl', '.gal')):
+        users = load_gallery_users(argument)
+        encodings = np.asarray([e for user in users for e in user['encodings']], dtype=np.float32)
+        return users, encodings
+    users, centers = synthetic_users(int(argument), encodings_per_user=6)
+    return users, centers
+
+
+# Função que gera rostos de consulta: metade perto de usuários cadastrados, metade desconhecidos.
+def make_queries(references, num_queries=400, seed=1):
+    rng = np.random.default_rng(seed)
+    known = references[rng.integers(0, len(references), size=num_queries // 2)]
+    known = known + rng.normal(0.0, 0.02, size=known.shape)
+    unknown = rng.normal(0.0, 0.1, size=(num_queries - len(known), references.shape[1]))
+    return np.concatenate([known, unknown]).astype(np.float32)
+
+
+# Função que estima a memória das listas de float64 do pickle (como o main.py grava).
+def python_lists_nbytes(users):
+    total = 0
+    for user in users:
+        encodings = [list(map(float, encoding)) for encoding in user['encodings']]
+        total += sys.getsizeof(encodings)
+        for encoding in encodings:
+            total += sys.getsizeof(encoding) + sum(sys.getsizeof(value) for value in encoding)
+    return total
+
+
+# Função que roda match_faces rosto a rosto e devolve nomes, ms/rosto e distâncias calculadas/rosto.
+def measure(gallery, queries, **options):
+    gallery['stats']['distance_evaluations'] = 0
+    names = []
+    start = time.perf_counter()
+    for query in queries:
+        user, _ = match_faces(gallery, [query], **options)[0]
+        names.append(user['name'] if user is not None else None)
+    elapsed_ms = 1000.0 * (time.perf_counter() - start) / len(queries)
+    return names, elapsed_ms, gallery['stats']['distance_evaluations'] / len(queries)
+
+
+def run_benchmark(argument='2000'):
+    users, references = load_users(argument)
+    gallery = build_gallery(users, ann_min_size=None)
+    queries = make_queries(references)
+    print(f"Galeria: {len(users)} usuários, {len(gallery['encodings'])} codificações, {len(queries)} rostos")
+
+    full, full_ms, full_evals = measure(gallery, queries, prune=False)
+    print(f"{'varredura completa':>20}: {full_ms:8.3f} ms/rosto  {full_evals:10.1f} distâncias/rosto")
+
+    pruned, pruned_ms, pruned_evals = measure(gallery, queries, prune=True)
+    print(f"{'poda centróide/raio':>20}: {pruned_ms:8.3f} ms/rosto  {pruned_evals:10.1f} distâncias/rosto  "
+          f"({full_evals / max(pruned_evals, 1):.1f}x menos)")
+
+    mismatches = sum(a != b for a, b in zip(full, pruned))
+    print(f"Resultados diferentes da varredura completa: {mismatches}")
+
+    # Memória e latência da galeria quantizada, ao lado das listas float64 originais.
+    print()
+    print(f"{'listas float64':>20}: {python_lists_nbytes(users) / 2**20:8.2f} MiB")
+    print(f"{'matriz float32':>20}: {gallery['encodings'].nbytes / 2**20:8.2f} MiB")
+    for mode in ('float16', 'int8'):
+        quantized = build_gallery(users, ann_min_size=None, quantization=mode)
+        names, elapsed_ms, _ = measure(quantized, queries)
+        mismatches = sum(a != b for a, b in zip(full, names))
+        print(f"{mode:>20}: {quantized_nbytes(quantized['quantized']) / 2**20:8.2f} MiB  "
+              f"{elapsed_ms:8.3f} ms/rosto  resultados diferentes: {mismatches}")
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else '2000')
@@ -0,0 +1,102 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : cache_identidades.py                           #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : testar primeiro as pessoas vistas recentemente #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# galeria.py                                                 #
+# cache_identidades.py                                       #
+# -----------------------------------------------------------#
+# Na porta aparecem quase sempre as mesmas pessoas. O cache guarda os nomes
+# das últimas identidades reconhecidas (política 'lru') ou das mais
+# frequentes ('lfu'). Cada rosto é comparado só com as codificações desses
+# usuários; se o mais próximo deles estiver dentro da tolerância e nenhum outro
+# usuário puder estar mais perto (limite inferior |rosto - centróide| - raio
+# maior que a distância achada), a busca completa é pulada. Caso contrário o
+# rosto segue para a busca completa, então o resultado é sempre o mesmo dela.
+# O cache guarda nomes, então continua valendo depois de recarregar a galeria.
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from galeria import gallery_rows, PRUNE_MARGIN
+
+CACHE_POLICIES = ('lru', 'lfu')
+
+
+class IdentityCache:
+    def __init__(self, size=8, policy='lru'):
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Política de cache inválida: {policy} (use {CACHE_POLICIES})")
+        self.size = size
+        self.policy = policy
+        self._entries = OrderedDict()  # nome -> nº de acertos (ordem = uso mais recente no fim)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'distance_evaluations': 0, 'saved_distance_evaluations': 0}
+
+    # Procura o rosto entre os usuários do cache. Retorna (usuário, distância) ou None.
+    def lookup(self, gallery, encoding, tolerance=0.5):
+        with self._lock:
+            names = list(self._entries)
+        rows = []
+        for name in names:
+            position = gallery['name_index'].get(name)
+            if position is not None:
+                rows.append(np.arange(gallery['offsets'][position], gallery['offsets'][position + 1]))
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+
+        best = None
+        evaluations = len(rows)
+        saved = 0
+        if len(rows):
+            query = np.asarray(encoding, dtype=np.float32).reshape(128)
+            distances = np.linalg.norm(gallery_rows(gallery, rows) - query, axis=1)
+            nearest = int(np.argmin(distances))
+            distance = float(distances[nearest])
+            if distance <= tolerance:
+                # O acerto só vale se nenhum usuário fora do cache puder estar mais perto.
+                lower = np.linalg.norm(gallery['centroids'] - query, axis=1) - gallery['radii']
+                evaluations += len(lower)
+                cached = np.zeros(len(lower), dtype=bool)
+                cached[gallery['owners'][rows]] = True
+                if np.all(lower[~cached] > distance + PRUNE_MARGIN):
+                    best = (gallery['users'][gallery['owners'][rows[nearest]]], distance)
+                    # Economia em relação à busca podada (centróides + linhas dos
+                    # usuários que passariam na poda), que é o que rodaria sem o cache.
+                    candidates = (lower <= tolerance + PRUNE_MARGIN)[gallery['owners']]
+                    saved = max(0, len(lower) + int(np.count_nonzero(candidates)) - evaluations)
+
+        with self._lock:
+            self.stats['distance_evaluations'] += evaluations
+            if best is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            self.stats['saved_distance_evaluations'] += saved
+        self.record(best[0]['name'])
+        return best
+
+    # Registra que a identidade foi vista (acerto do cache ou da busca completa).
+    def record(self, name):
+        with self._lock:
+            if name in self._entries:
+                self._entries[name] += 1
+                self._entries.move_to_end(name)
+                return
+            if len(self._entries) >= self.size:
+                if self.policy == 'lru':
+                    self._entries.popitem(last=False)
+                else:
+                    # Menos frequente; no empate, o usado há mais tempo (primeiro na ordem).
+                    victim = min(self._entries, key=self._entries.get)
+                    del self._entries[victim]
+            self._entries[name] = 1
+
+    # Taxa de acertos do cache (0 a 1).
+    def hit_rate(self):
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return self.stats['hits'] / total if total else 0.0
@@ -0,0 +1,82 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : captura.py                                     #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : thread de captura da webcam com um único slot  #
+#             para o frame mais recente                      #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# captura.py                                                 #
+# -----------------------------------------------------------#
+# A thread chama só video_capture.grab() nos frames descartados (o driver
+# entrega o frame, mas ele não é decodificado). O retrieve(), que decodifica,
+# só acontece quando alguém pediu um frame com read() e já passaram pelo
+# menos frame_skip frames desde o último decodificado. O frame vai para um
+# slot único: quem lê sempre recebe o mais novo e a captura nunca espera a
+# detecção.
+
+import time
+import threading
+
+
+class FrameGrabber(threading.Thread):
+    def __init__(self, video_capture, frame_skip=1):
+        super().__init__(daemon=True)
+        self.video_capture = video_capture
+        self.frame_skip = max(1, frame_skip)
+        self.frame_count = 0
+        self.stats = {'grabbed': 0, 'decoded': 0}
+        self._condition = threading.Condition()
+        self._requested = False
+        self._slot = None  # (frame, instante da captura, número do frame)
+        self._running = True
+
+    def run(self):
+        last_decoded = -self.frame_skip
+        while self._running:
+            if not self.video_capture.grab():
+                print("Falha ao capturar frame da webcam.")
+                break
+            captured_at = time.time()
+            self.frame_count += 1
+            self.stats['grabbed'] += 1
+
+            with self._condition:
+                wanted = self._requested
+            if not wanted or self.frame_count - last_decoded < self.frame_skip:
+                continue  # Frame descartado sem decodificar.
+
+            ret, frame = self.video_capture.retrieve()
+            if not ret:
+                continue
+            last_decoded = self.frame_count
+            self.stats['decoded'] += 1
+            with self._condition:
+                self._slot = (frame, captured_at, self.frame_count)
+                self._requested = False
+                self._condition.notify_all()
+
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    # Pede um frame novo e espera por ele. Retorna (ret, frame, instante da captura).
+    def read(self, timeout=None):
+        with self._condition:
+            self._requested = True
+            self._slot = None
+            self._condition.wait_for(lambda: self._slot is not None or not self._running, timeout)
+            if self._slot is None:
+                return False, None, None
+            frame, captured_at, _ = self._slot
+            self._slot = None
+            return True, frame, captured_at
+
+    # Encerra a thread de captura.
+    def stop(self):
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        self.join(timeout=2)
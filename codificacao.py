@@ -0,0 +1,127 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : codificacao.py                                 #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : gerar as codificações a partir de recortes do  #
+#             rosto (face chips) em resolução cheia          #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# reconhecimento_paralelo.py                                 #
+# codificacao.py                                             #
+# -----------------------------------------------------------#
+# Detecção "grossa para fina": o HOG roda no frame reduzido (barato), as
+# caixas são levadas de volta à resolução original com upscale_boxes() e
+# cada rosto é recortado do frame original.
+#
+# Face chips: a etapa de detecção não manda mais o frame inteiro para o
+# reconhecimento. Cada rosto vira um recorte quadrado, centrado na caixa,
+# com folga para os landmarks, já em RGB e redimensionado para CHIP_SIZE.
+# Os recortes de um frame formam um único array (N, CHIP_SIZE, CHIP_SIZE, 3)
+# uint8, pequeno e contíguo, barato de copiar para outro processo. Em todo
+# recorte o rosto ocupa a mesma caixa (CHIP_BOX), então o encoding trabalha
+# direto nos recortes, sem cvtColor no frame inteiro.
+# O rosto ocupa ~133 px do recorte, mais que os ~100 px que o dlib usa no
+# próprio chip de 150x150 do encoding, então não há perda de detalhe.
+# O tempo de encoding de cada rosto é devolvido junto, em milissegundos.
+# As codificações são posicionais: uma por recorte, None quando o dlib não
+# consegue codificar o rosto, para o resultado nunca ir para o rosto errado.
+#
+# Vários rostos no mesmo frame: o ChipEncoder distribui os recortes de um
+# frame entre processos persistentes (o encoding do dlib não solta o GIL, então
+# threads não ajudam) e junta os resultados na ordem dos rostos. Os processos
+# são criados com forkserver/spawn (deteccao.process_context), não com fork.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import cv2
+import numpy as np
+import face_recognition
+from deteccao import process_context
+
+CHIP_SIZE = 200
+# Folga ao redor da caixa (fração do lado) para os 68 landmarks caberem no recorte.
+CROP_PADDING = 0.25
+# Caixa (top, right, bottom, left) do rosto dentro de cada recorte.
+_margin = int(round(CHIP_SIZE * CROP_PADDING / (1 + 2 * CROP_PADDING)))
+CHIP_BOX = (_margin, CHIP_SIZE - _margin, CHIP_SIZE - _margin, _margin)
+
+
+# Função que leva caixas (top, right, bottom, left) do frame reduzido por 'scale' para o frame original.
+def upscale_boxes(boxes, scale, shape=None):
+    factor = 1.0 / scale
+    height, width = shape[:2] if shape is not None else (None, None)
+    result = []
+    for top, right, bottom, left in boxes:
+        box = (int(top * factor), int(right * factor), int(bottom * factor), int(left * factor))
+        if shape is not None:
+            box = (max(0, box[0]), min(width, box[1]), min(height, box[2]), max(0, box[3]))
+        result.append(box)
+    return result
+
+
+# Função que recorta um rosto: quadrado centrado na caixa, com folga, em RGB e
+# do tamanho CHIP_SIZE. A parte que sai do frame fica preta.
+def face_chip(frame, box, size=CHIP_SIZE, padding=CROP_PADDING):
+    top, right, bottom, left = box
+    side = max(bottom - top, right - left) * (1 + 2 * padding)
+    center_y, center_x = (top + bottom) / 2.0, (left + right) / 2.0
+    y0, x0 = int(round(center_y - side / 2)), int(round(center_x - side / 2))
+    y1, x1 = y0 + int(round(side)), x0 + int(round(side))
+    height, width = frame.shape[:2]
+    crop = frame[max(0, y0):min(height, y1), max(0, x0):min(width, x1)]
+    if (y0, x0, y1, x1) != (max(0, y0), max(0, x0), min(height, y1), min(width, x1)):
+        crop = cv2.copyMakeBorder(crop, max(0, -y0), max(0, y1 - height), max(0, -x0), max(0, x1 - width),
+                                  cv2.BORDER_CONSTANT, value=0)
+    chip = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA if side > size else cv2.INTER_LINEAR)
+    return cv2.cvtColor(chip, cv2.COLOR_BGR2RGB)
+
+
+# Função que gera os recortes de todos os rostos do frame (BGR) num único array.
+def extract_face_chips(frame, boxes, size=CHIP_SIZE):
+    chips = np.empty((len(boxes), size, size, 3), dtype=np.uint8)
+    for i, box in enumerate(boxes):
+        chips[i] = face_chip(frame, box, size)
+    return chips
+
+
+# Função que gera a codificação de cada recorte.
+# Retorna (codificações, tempo de encoding de cada rosto em ms), uma posição por
+# recorte; a codificação é None quando o rosto não pôde ser codificado.
+def encode_face_chips(chips, chip_box=CHIP_BOX):
+    encodings, times_ms = [], []
+    for chip in chips:
+        start = time.perf_counter()
+        result = face_recognition.face_encodings(chip, [chip_box])
+        encodings.append(result[0] if result else None)
+        times_ms.append(1000.0 * (time.perf_counter() - start))
+    return encodings, times_ms
+
+
+# Roda num processo do ChipEncoder: codifica um recorte.
+def _encode_chip(chip, chip_box=CHIP_BOX):
+    encodings, times_ms = encode_face_chips(chip[np.newaxis], chip_box)
+    return encodings[0], times_ms[0]
+
+
+class ChipEncoder:
+    def __init__(self, workers=None, use_processes=True):
+        self.workers = workers or os.cpu_count() or 1
+        if use_processes:
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=process_context())
+        else:
+            self.pool = ThreadPoolExecutor(self.workers)
+        # Aquece os processos (importa o dlib e carrega os modelos) antes do primeiro frame.
+        list(self.pool.map(_encode_chip, np.zeros((self.workers, CHIP_SIZE, CHIP_SIZE, 3), np.uint8)))
+
+    # Codifica os recortes de um frame em paralelo. Mesmo retorno de encode_face_chips.
+    def encode(self, chips, chip_box=CHIP_BOX):
+        if len(chips) <= 1:
+            return encode_face_chips(chips, chip_box)
+        results = list(self.pool.map(_encode_chip, chips, [chip_box] * len(chips)))
+        return [encoding for encoding, _ in results], [ms for _, ms in results]
+
+    def close(self):
+        self.pool.shutdown(wait=True)
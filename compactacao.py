@@ -0,0 +1,181 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : compactacao.py                                 #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : limitar as codificações de cada usuário a K    #
+#             protótipos representativos                     #
+#                                                            #
+# arquivos desse sistema:                                    #
+# main.py                                                    #
+# galeria.py                                                 #
+# compactacao.py                                             #
+# -----------------------------------------------------------#
+#USO
+
+# Compacta a galeria inteira para no máximo 10 protótipos por usuário e
+# mostra a cobertura do reconhecimento antes e depois:
+#python compactacao.py /home/felipe/encodings.gal 10
+
+# Cobertura medida em fotos separadas (pasta/<nome do usuário>/*.jpg):
+#python compactacao.py /home/felipe/encodings.gal 10 /home/felipe/fotos_teste
+
+# Sem a pasta de fotos, 20% das codificações de cada usuário (com pelo menos
+# 2) ficam de fora da compactação e são usadas como teste.
+# 'farthest': seleção gulosa do ponto mais distante (cobre a variação das fotos).
+# 'medoids' : k-medoids iniciado pelo 'farthest' (protótipos mais centrais).
+
+import os
+import sys
+import numpy as np
+from galeria import build_gallery, match_faces
+from indice_ann import update_index_file
+from formato_galeria import load_users, write_gallery
+from notificacao import publish_gallery_change
+
+MAX_PROTOTYPES = 10
+KMEDOIDS_ITERATIONS = 20
+
+
+# Função que calcula a matriz de distâncias entre todas as codificações de um usuário.
+def _pairwise_distances(vectors):
+    sq = np.einsum('ij,ij->i', vectors, vectors)
+    d2 = sq[:, None] + sq[None, :] - 2.0 * (vectors @ vectors.T)
+    return np.sqrt(np.maximum(d2, 0.0))
+
+
+# Função que escolhe k protótipos pela seleção gulosa do ponto mais distante.
+# Começa pela codificação mais próxima da média e, a cada passo, pega a que
+# está mais longe dos protótipos já escolhidos (nunca uma já escolhida, mesmo
+# com codificações idênticas).
+def farthest_point_prototypes(vectors, k, distances=None):
+    if distances is None:
+        distances = _pairwise_distances(vectors)
+    first = int(np.argmin(np.linalg.norm(vectors - vectors.mean(axis=0), axis=1)))
+    chosen = [first]
+    nearest = distances[first].copy()
+    nearest[first] = -np.inf
+    while len(chosen) < k:
+        candidate = int(np.argmax(nearest))
+        chosen.append(candidate)
+        nearest = np.minimum(nearest, distances[candidate])
+        nearest[candidate] = -np.inf
+    return np.array(chosen)
+
+
+# Função que escolhe k protótipos por k-medoids (alternando atribuição e troca de medoide).
+def kmedoids_prototypes(vectors, k):
+    distances = _pairwise_distances(vectors)
+    medoids = farthest_point_prototypes(vectors, k, distances)
+    for _ in range(KMEDOIDS_ITERATIONS):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        new_medoids = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(assignment == cluster)
+            if len(members):
+                costs = distances[np.ix_(members, members)].sum(axis=1)
+                new_medoids[cluster] = members[np.argmin(costs)]
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+    return medoids
+
+
+# Função que reduz as codificações de um usuário a no máximo k protótipos.
+def compact_encodings(encodings, k=MAX_PROTOTYPES, method='farthest'):
+    vectors = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    if len(vectors) <= k:
+        return [list(map(float, vector)) for vector in vectors]
+    if method == 'farthest':
+        chosen = farthest_point_prototypes(vectors, k)
+    elif method == 'medoids':
+        chosen = kmedoids_prototypes(vectors, k)
+    else:
+        raise ValueError(f"Método de compactação inválido: {method} (use 'farthest' ou 'medoids')")
+    return [list(map(float, vectors[index])) for index in np.unique(chosen)]
+
+
+# Função que compacta todos os usuários (devolve uma nova lista, sem alterar a original).
+def compact_users(users, k=MAX_PROTOTYPES, method='farthest'):
+    return [dict(user, encodings=compact_encodings(user['encodings'], k, method)) for user in users]
+
+
+# Função que mede a cobertura: fração dos rostos de teste (nome, codificação)
+# reconhecidos como o usuário certo com a tolerância usada nos reconhecedores.
+def coverage(users, held_out, tolerance=0.5):
+    if not held_out:
+        return float('nan')
+    gallery = build_gallery(users, ann_min_size=None)
+    matches = match_faces(gallery, [encoding for _, encoding in held_out], tolerance)
+    hits = sum(user is not None and user['name'] == name for (name, _), (user, _) in zip(held_out, matches))
+    return hits / len(held_out)
+
+
+# Função que separa 20% das codificações de cada usuário para teste.
+def split_held_out(users, fraction=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    kept, held_out = [], []
+    for user in users:
+        encodings = np.asarray(user['encodings'], dtype=np.float32).reshape(-1, 128)
+        order = rng.permutation(len(encodings))
+        size = int(len(encodings) * fraction) if len(encodings) >= 2 else 0
+        held_out.extend((user['name'], encodings[index]) for index in order[:size])
+        kept.append(dict(user, encodings=encodings[np.sort(order[size:])]))
+    return kept, held_out
+
+
+# Função que codifica as fotos de teste de pasta/<nome>/*.jpg com o face_recognition.
+def load_held_out_photos(folder):
+    import face_recognition  # Só é necessário quando há fotos de teste.
+    held_out = []
+    for name in sorted(os.listdir(folder)):
+        user_folder = os.path.join(folder, name)
+        if not os.path.isdir(user_folder):
+            continue
+        for photo in sorted(os.listdir(user_folder)):
+            image = face_recognition.load_image_file(os.path.join(user_folder, photo))
+            encoding = face_recognition.face_encodings(image)
+            if encoding:
+                held_out.append((name, encoding[0]))
+    return held_out
+
+
+# Função do processo em lote: compacta a galeria, grava e mostra a cobertura antes/depois.
+# O índice IVF (por padrão o encodings_ivf.npz ao lado da galeria) é atualizado com os
+# usuários que mudaram, antes da galeria, como no main.py.
+def compact_gallery_file(gallery_file, k=MAX_PROTOTYPES, photos_folder=None, method='farthest', index_file=None):
+    users = load_users(gallery_file)
+    if photos_folder:
+        reference, held_out = users, load_held_out_photos(photos_folder)
+    else:
+        reference, held_out = split_held_out(users)
+
+    total = sum(len(user['encodings']) for user in reference)
+    print(f"Galeria: {len(users)} usuários, {total} codificações, {len(held_out)} rostos de teste")
+    print(f"{'sem compactação':>18}: {total:7d} codificações  cobertura={coverage(reference, held_out):.3f}")
+    for option in ('farthest', 'medoids'):
+        compacted = compact_users(reference, k, option)
+        size = sum(len(user['encodings']) for user in compacted)
+        print(f"{option + ' K=' + str(k):>18}: {size:7d} codificações  cobertura={coverage(compacted, held_out):.3f}")
+
+    compacted = compact_users(users, k, method)
+    if gallery_file.endswith('.pkl'):
+        gallery_file = gallery_file[:-len('.pkl')] + '.gal'
+    if index_file is None:
+        index_file = os.path.join(os.path.dirname(os.path.abspath(gallery_file)), 'encodings_ivf.npz')
+    changed = [i for i, (old, new) in enumerate(zip(users, compacted)) if len(old['encodings']) != len(new['encodings'])]
+    if changed or not os.path.exists(index_file):
+        update_index_file(index_file, compacted, changed)
+    write_gallery(gallery_file, compacted)
+    publish_gallery_change(None, gallery_file)  # Os reconhecedores recarregam a galeria.
+    print(f"Galeria compactada ({method}) gravada em {gallery_file}")
+    return compacted
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python compactacao.py <encodings.gal> [K] [pasta_fotos_teste]")
+        sys.exit(1)
+    compact_gallery_file(sys.argv[1],
+                         int(sys.argv[2]) if len(sys.argv) > 2 else MAX_PROTOTYPES,
+                         sys.argv[3] if len(sys.argv) > 3 else None)
@@ -0,0 +1,116 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : configuracao_camera.py                         #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : abrir a webcam já na resolução de              #
+#             processamento, sem decodificar e reduzir o     #
+#             frame cheio                                    #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# configuracao_camera.py                                     #
+# -----------------------------------------------------------#
+# O cv2.VideoCapture(0) abre no modo padrão do driver e cada frame era
+# reduzido com cv2.resize. Aqui pedimos ao dispositivo (CAP_PROP_*) o menor
+# modo que ainda garante o tamanho mínimo de rosto que o HOG detecta:
+#     largura necessária = HOG_MIN_FACE / target_face_fraction
+# onde target_face_fraction é a largura do menor rosto esperado em relação à
+# largura da imagem (ex.: 0.125 = 1/8 da imagem na distância da porta).
+# O driver nem sempre aceita o que pedimos, então lemos de volta o que foi
+# concedido. Se o modo concedido for maior que o necessário, devolvemos o
+# resize_scale que ainda falta; se bater, resize_scale = 1.0 e o resize some.
+# FOURCC: YUYV não tem decodificação JPEG (melhor em resoluções baixas);
+# MJPG é o fallback quando o YUYV não é aceito ou não tem o FPS pedido.
+
+import math
+import cv2
+
+# Menor rosto (pixels de largura) que o HOG do face_recognition detecta com upsample=1.
+HOG_MIN_FACE = 40
+# Modos comuns de webcams UVC, do menor para o maior.
+CAPTURE_MODES = [(320, 240), (352, 288), (640, 480), (800, 600), (1280, 720), (1920, 1080)]
+FOURCC_PREFERENCE = ('YUYV', 'MJPG')
+# Até esta folga acima da largura necessária o frame vai direto para o HOG, sem resize.
+RESIZE_TOLERANCE = 1.25
+
+
+# Função que converte o CAP_PROP_FOURCC (número) para texto, ex.: 'MJPG'.
+def fourcc_to_str(value):
+    value = int(value)
+    return ''.join(chr((value >> 8 * i) & 0xFF) for i in range(4))
+
+
+# Função que calcula a menor largura de frame que ainda atende ao tamanho de rosto desejado.
+def required_width(target_face_fraction, min_face=HOG_MIN_FACE):
+    return int(math.ceil(min_face / float(target_face_fraction)))
+
+
+# Função que escolhe, entre os modos, os que atendem à largura necessária (do menor para o maior).
+def candidate_modes(target_face_fraction, modes=CAPTURE_MODES, min_face=HOG_MIN_FACE):
+    needed = required_width(target_face_fraction, min_face)
+    fitting = sorted(mode for mode in modes if mode[0] >= needed)
+    return fitting or [max(modes)]
+
+
+# Função que pede um modo ao dispositivo e devolve o que foi realmente concedido.
+def request_mode(video_capture, width, height, fps=None, fourcc=None):
+    # O FOURCC vai primeiro: no V4L2 ele define quais resoluções existem.
+    if fourcc:
+        video_capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        video_capture.set(cv2.CAP_PROP_FPS, fps)
+    return {
+        'width': int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': video_capture.get(cv2.CAP_PROP_FPS),
+        'fourcc': fourcc_to_str(video_capture.get(cv2.CAP_PROP_FOURCC)),
+    }
+
+
+# Função que abre a câmera no menor modo que atende ao rosto mínimo.
+# Retorna (video_capture, modo concedido, resize_scale que ainda falta aplicar).
+def open_camera(device=0, target_face_fraction=0.125, fps=15, fourcc_preference=FOURCC_PREFERENCE, modes=CAPTURE_MODES):
+    video_capture = cv2.VideoCapture(device)
+    if not video_capture.isOpened():
+        return video_capture, None, 1.0
+
+    needed = required_width(target_face_fraction)
+    probed = []  # (modo concedido, (largura, altura, fourcc) pedidos)
+    for width, height in candidate_modes(target_face_fraction, modes):
+        for fourcc in fourcc_preference:
+            granted = request_mode(video_capture, width, height, fps, fourcc)
+            print(f"[INFO] Câmera: pedido {width}x{height} {fourcc} {fps}fps, concedido "
+                  f"{granted['width']}x{granted['height']} {granted['fourcc']} {granted['fps']:.0f}fps")
+            probed.append((granted, (width, height, fourcc)))
+            if granted['width'] >= needed and meets_fps(granted, fps) and resize_for(granted, needed) == 1.0:
+                return video_capture, granted, 1.0
+
+    # Nenhum modo dispensou o resize: volta ao menor modo com largura e FPS; se o FPS
+    # nunca bateu, ao menor com a largura; se nem a largura bateu, ao mais largo.
+    # O modo é pedido de novo, então a câmera nunca fica no último (maior) modo testado.
+    wide = [probe for probe in probed if probe[0]['width'] >= needed]
+    fast = [probe for probe in wide if meets_fps(probe[0], fps)]
+    if wide:
+        chosen = min(fast or wide, key=lambda probe: probe[0]['width'])
+    else:
+        chosen = max(probed, key=lambda probe: probe[0]['width'])
+    granted = chosen[0]
+    if chosen is not probed[-1]:
+        width, height, fourcc = chosen[1]
+        granted = request_mode(video_capture, width, height, fps, fourcc)
+    return video_capture, granted, resize_for(granted, needed)
+
+
+# O modo concedido tem o FPS pedido? (sem FPS pedido ou sem leitura do driver, aceita).
+def meets_fps(granted, fps):
+    return not (fps and granted['fps'] and granted['fps'] < fps)
+
+
+# resize_scale que ainda falta para levar o modo concedido à largura necessária (1.0 = sem resize).
+def resize_for(granted, needed):
+    if not granted or granted['width'] <= needed * RESIZE_TOLERANCE:
+        return 1.0
+    return needed / float(granted['width'])
@@ -0,0 +1,116 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : controle_adaptativo.py                         #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : ajustar frame_skip e resize_scale em tempo de  #
+#             execução para manter a latência no alvo        #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# controle_adaptativo.py                                     #
+# -----------------------------------------------------------#
+# Em vez de editar frame_skip/resize_scale no fim do script e reiniciar, o
+# controlador mede durante a execução:
+#   - latência da detecção (resize + HOG) e do reconhecimento (encoding + busca)
+#   - latência ponta a ponta (captura do frame -> resultado do reconhecimento)
+#   - profundidade da fila e uso de CPU do processo (fração de todos os núcleos)
+# A cada 'interval' segundos compara as médias com o alvo:
+#   - acima do alvo (ou da CPU): primeiro aumenta o frame_skip; no limite,
+#     reduz o resize_scale
+#   - bem abaixo do alvo: primeiro devolve o resize_scale (qualidade), depois
+#     reduz o frame_skip
+# Os valores ficam sempre dentro dos limites configurados e todo ajuste é
+# registrado no log com o motivo; 'adjustments' guarda só os últimos
+# 'history' ajustes (a contagem total fica em 'adjustment_count').
+
+import os
+import time
+import threading
+from collections import deque
+
+ADJUSTMENT_HISTORY = 100  # Ajustes guardados em memória (o processo roda dias seguidos).
+
+
+class AdaptiveController:
+    def __init__(self, frame_skip, resize_scale, target_latency_ms=600, cpu_budget=0.8,
+                 skip_bounds=(2, 30), scale_bounds=(0.3, 1.0), interval=5.0, smoothing=0.3,
+                 history=ADJUSTMENT_HISTORY):
+        self.target_latency_ms = target_latency_ms
+        self.cpu_budget = cpu_budget
+        self.skip_bounds = skip_bounds
+        self.scale_bounds = scale_bounds
+        self.interval = interval
+        self.smoothing = smoothing
+        self.frame_skip = min(max(frame_skip, skip_bounds[0]), skip_bounds[1])
+        self.resize_scale = min(max(resize_scale, scale_bounds[0]), scale_bounds[1])
+        self.latency = {'detect_ms': None, 'recognize_ms': None, 'end_to_end_ms': None, 'queue_depth': None}
+        self.cpu = None
+        self.adjustments = deque(maxlen=history)
+        self.adjustment_count = 0
+        self._lock = threading.Lock()
+        self._last_check = time.time()
+        self._last_cpu = time.process_time()
+
+    # Média móvel exponencial de uma medida.
+    def _observe(self, key, value):
+        previous = self.latency[key]
+        self.latency[key] = value if previous is None else previous + self.smoothing * (value - previous)
+
+    # Chamado pela detecção: tempo de resize + HOG e profundidade da fila.
+    def record_detection(self, seconds, queue_depth):
+        with self._lock:
+            self._observe('detect_ms', seconds * 1000.0)
+            self._observe('queue_depth', queue_depth)
+
+    # Chamado pelo reconhecimento: tempo de encoding + busca e instante da captura do frame.
+    def record_recognition(self, seconds, captured_at):
+        with self._lock:
+            self._observe('recognize_ms', seconds * 1000.0)
+            self._observe('end_to_end_ms', (time.time() - captured_at) * 1000.0)
+
+    # Reavalia os parâmetros a cada 'interval' segundos. Retorna True se algo mudou.
+    def update(self, now=None):
+        now = time.time() if now is None else now
+        elapsed = now - self._last_check
+        if elapsed < self.interval:
+            return False
+        cpu_time = time.process_time()
+        with self._lock:
+            self.cpu = (cpu_time - self._last_cpu) / elapsed / (os.cpu_count() or 1)
+            self._last_check, self._last_cpu = now, cpu_time
+            latency = self.latency['end_to_end_ms']
+            if latency is None:
+                # Sem reconhecimentos no período: usa o que já se sabe (detecção + fila).
+                latency = self.latency['detect_ms'] or 0.0
+            overloaded = latency > self.target_latency_ms or self.cpu > self.cpu_budget
+            idle = latency < 0.6 * self.target_latency_ms and self.cpu < 0.7 * self.cpu_budget
+            # Depois do ajuste, a média recomeça com as medidas dos novos parâmetros.
+            self.latency['end_to_end_ms'] = None
+
+        if overloaded:
+            reason = f"latência {latency:.0f}ms / CPU {self.cpu:.0%} acima do alvo ({self.target_latency_ms}ms / {self.cpu_budget:.0%})"
+            if self.frame_skip < self.skip_bounds[1]:
+                return self._adjust('frame_skip', min(self.skip_bounds[1], self.frame_skip + max(1, self.frame_skip // 4)), reason)
+            if self.resize_scale > self.scale_bounds[0]:
+                return self._adjust('resize_scale', max(self.scale_bounds[0], round(self.resize_scale - 0.1, 2)), reason)
+        elif idle:
+            reason = f"latência {latency:.0f}ms / CPU {self.cpu:.0%} com folga"
+            if self.resize_scale < self.scale_bounds[1]:
+                return self._adjust('resize_scale', min(self.scale_bounds[1], round(self.resize_scale + 0.1, 2)), reason)
+            if self.frame_skip > self.skip_bounds[0]:
+                return self._adjust('frame_skip', max(self.skip_bounds[0], self.frame_skip - max(1, self.frame_skip // 4)), reason)
+        return False
+
+    def _adjust(self, name, value, reason):
+        old = getattr(self, name)
+        setattr(self, name, value)
+        self.adjustments.append((time.time(), name, old, value, reason))
+        self.adjustment_count += 1
+        print(f"[AJUSTE] {name}: {old} -> {value} ({reason}; detecção {self._format('detect_ms')}, "
+              f"reconhecimento {self._format('recognize_ms')}, fila {self._format('queue_depth', '.1f')})")
+        return True
+
+    def _format(self, key, spec='.0f'):
+        value = self.latency[key]
+        return '-' if value is None else format(value, spec)
@@ -0,0 +1,255 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : deteccao.py                                    #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : detectores de rosto combinados (Haar + HOG),   #
+#             HOG em blocos paralelos e pool de detectores   #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# benchmark_deteccao.py                                      #
+# deteccao.py                                                #
+# -----------------------------------------------------------#
+# Cascata em dois estágios:
+#   1) o Haar do OpenCV (haarcascade_frontalface_default.xml, o mesmo do
+#      main_no_Dlib.py) roda no frame inteiro e propõe regiões candidatas.
+#      Os parâmetros são mais permissivos que os do main_no_Dlib.py (1.3, 5)
+#      porque aqui o Haar só não pode perder rosto; os falsos positivos o
+#      HOG descarta.
+#   2) o HOG do dlib (face_recognition.face_locations) roda só em recortes
+#      com folga ao redor de cada proposta, confirma o rosto e gera as caixas
+#      usadas no encoding.
+# Propostas que se sobrepõem viram um único recorte, e as caixas confirmadas
+# passam por supressão de não-máximos para não repetir o mesmo rosto.
+#
+# HOG em blocos (câmeras 1080p+ num saguão): reduzir o frame faz perder os
+# rostos distantes, e o HOG no frame inteiro numa só thread é lento demais.
+# O TiledHogDetector divide o frame em blocos que se sobrepõem, roda o
+# face_locations de cada bloco num pool de processos (um por núcleo) e junta
+# as caixas. A sobreposição deve ser maior que o maior rosto esperado, assim
+# todo rosto cabe inteiro em pelo menos um bloco; as caixas repetidas ou
+# cortadas na emenda entre blocos saem na supressão de não-máximos.
+# Os processos são criados com 'forkserver' (ou 'spawn'), e não com fork:
+# quando o detector sobe, o processo principal já tem threads rodando
+# (watcher, captura), como no reconhecimento_paralelo.py.
+#
+# Pool de detectores: o HOG de um frame não precisa esperar o do anterior.
+# O DetectorPool manda cada frame (já reduzido) para um de N processos e
+# devolve as caixas na ordem da captura (ReorderBuffer), então as etapas
+# seguintes não percebem o paralelismo. Os processos também usam o
+# process_context() (forkserver/spawn), como os do TiledHogDetector.
+#
+# Todas as caixas seguem o padrão do face_recognition: (top, right, bottom, left).
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+import cv2
+import face_recognition
+from rastreador import box_iou
+from fila_frames import ReorderBuffer
+
+
+# Fração da caixa menor que está dentro da maior (1.0 = totalmente contida).
+def box_containment(a, b):
+    height = min(a[2], b[2]) - max(a[0], b[0])
+    width = min(a[1], b[1]) - max(a[3], b[3])
+    smaller = min((a[1] - a[3]) * (a[2] - a[0]), (b[1] - b[3]) * (b[2] - b[0]))
+    return max(0, height) * max(0, width) / smaller if smaller > 0 else 0.0
+
+
+# Função que remove caixas repetidas: mantém a maior de cada grupo com IoU acima do limite.
+# Com containment_threshold, também remove caixas quase inteiras dentro de outra
+# (pedaço de rosto detectado na borda de um bloco).
+def non_max_suppression(boxes, iou_threshold=0.3, containment_threshold=None):
+    ordered = sorted(boxes, key=lambda b: (b[1] - b[3]) * (b[2] - b[0]), reverse=True)
+    kept = []
+    for box in ordered:
+        if any(box_iou(box, other) > iou_threshold for other in kept):
+            continue
+        if containment_threshold is not None and any(box_containment(box, other) > containment_threshold for other in kept):
+            continue
+        kept.append(box)
+    return kept
+
+
+# Função que junta retângulos (top, right, bottom, left) que se tocam num único retângulo.
+def merge_regions(regions):
+    merged = list(regions)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if a[0] <= b[2] and a[2] >= b[0] and a[3] <= b[1] and a[1] >= b[3]:
+                    merged[i] = (min(a[0], b[0]), max(a[1], b[1]), max(a[2], b[2]), min(a[3], b[3]))
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+
+class HaarHogDetector:
+    def __init__(self, scale_factor=1.1, min_neighbors=3, min_size=(30, 30), padding=0.5, upsample=1):
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        if self.cascade.empty():
+            raise RuntimeError("Não foi possível carregar o haarcascade_frontalface_default.xml")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.padding = padding
+        self.upsample = upsample
+        self.stats = {'frames': 0, 'proposals': 0, 'crops': 0, 'faces': 0, 'hog_pixels': 0, 'frame_pixels': 0}
+
+    # Regiões candidatas do Haar, já com folga e limitadas à imagem.
+    def propose(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        gray = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2GRAY)
+        faces = self.cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors, minSize=self.min_size)
+        regions = []
+        for (x, y, w, h) in faces:
+            pad_x, pad_y = int(w * self.padding), int(h * self.padding)
+            regions.append((max(0, y - pad_y), min(width, x + w + pad_x), min(height, y + h + pad_y), max(0, x - pad_x)))
+        self.stats['proposals'] += len(regions)
+        return merge_regions(regions)
+
+    # Detecta rostos na imagem RGB. Retorna caixas (top, right, bottom, left) confirmadas pelo HOG.
+    def detect(self, rgb_image):
+        self.stats['frames'] += 1
+        self.stats['frame_pixels'] += rgb_image.shape[0] * rgb_image.shape[1]
+        boxes = []
+        for top, right, bottom, left in self.propose(rgb_image):
+            crop = rgb_image[top:bottom, left:right]
+            self.stats['crops'] += 1
+            self.stats['hog_pixels'] += crop.shape[0] * crop.shape[1]
+            for (t, r, b, l) in face_recognition.face_locations(crop, self.upsample, model="hog"):
+                boxes.append((t + top, r + left, b + top, l + left))
+        boxes = non_max_suppression(boxes)
+        self.stats['faces'] += len(boxes)
+        return boxes
+
+    # Mesma interface do TiledHogDetector (aqui não há recursos para liberar).
+    def close(self):
+        pass
+
+
+# Função que divide a imagem em blocos (top, right, bottom, left) de até tile_size
+# pixels, com 'overlap' pixels de sobreposição entre blocos vizinhos.
+def tile_grid(shape, tile_size=640, overlap=160):
+    height, width = shape[:2]
+    step = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        return positions + [length - tile_size]  # O último bloco encosta na borda.
+
+    return [(top, min(width, left + tile_size), min(height, top + tile_size), left)
+            for top in starts(height) for left in starts(width)]
+
+
+# Roda no processo do pool: HOG num bloco, caixas devolvidas em coordenadas da imagem inteira.
+def _detect_tile(tile, offset, upsample):
+    top, left = offset
+    return [(t + top, r + left, b + top, l + left)
+            for (t, r, b, l) in face_recognition.face_locations(tile, upsample, model="hog")]
+
+
+# Contexto dos pools de processos: 'forkserver' onde existir, senão 'spawn'.
+def process_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class TiledHogDetector:
+    def __init__(self, tile_size=640, overlap=160, workers=None, upsample=1):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.upsample = upsample
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=process_context())
+        self.stats = {'frames': 0, 'tiles': 0, 'raw_boxes': 0, 'faces': 0}
+
+    # Detecta rostos na imagem RGB, bloco a bloco em paralelo.
+    def detect(self, rgb_image):
+        tiles = tile_grid(rgb_image.shape, self.tile_size, self.overlap)
+        futures = [self.pool.submit(_detect_tile, rgb_image[top:bottom, left:right], (top, left), self.upsample)
+                   for top, right, bottom, left in tiles]
+        boxes = [box for future in futures for box in future.result()]
+        merged = non_max_suppression(boxes, containment_threshold=0.6)
+        self.stats['frames'] += 1
+        self.stats['tiles'] += len(tiles)
+        self.stats['raw_boxes'] += len(boxes)
+        self.stats['faces'] += len(merged)
+        return merged
+
+    # Encerra os processos do pool.
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+_pool_detector = None  # Detector de cada processo do DetectorPool (criado no initializer).
+
+
+def _init_pool_detector(model_detection):
+    global _pool_detector
+    _pool_detector = HaarHogDetector() if model_detection == "haar_hog" else None
+
+
+# Roda no processo do DetectorPool: caixas do frame RGB.
+def _detect_frame(rgb_image, model_detection):
+    if _pool_detector is not None:
+        return _pool_detector.detect(rgb_image)
+    return face_recognition.face_locations(rgb_image, model=model_detection)
+
+
+class DetectorPool:
+    def __init__(self, workers, model_detection="hog", max_in_flight=None):
+        if model_detection == "tiled_hog":
+            raise ValueError("O tiled_hog já usa um pool próprio; use detection_workers=0 com ele.")
+        self.workers = workers
+        self.model_detection = model_detection
+        self.max_in_flight = max_in_flight or 2 * workers
+        self.pool = ProcessPoolExecutor(workers, mp_context=process_context(),
+                                        initializer=_init_pool_detector, initargs=(model_detection,))
+        self.stats = {'submitted': 0, 'completed': 0}
+        self._order = ReorderBuffer()
+        self._futures = {}  # seq -> (future, contexto)
+
+    # Há espaço para mais um frame em processamento?
+    def has_capacity(self):
+        return len(self._futures) < self.max_in_flight
+
+    # Envia um frame RGB. 'context' volta junto com as caixas.
+    def submit(self, rgb_image, context=None):
+        seq = self._order.reserve()
+        self._futures[seq] = (self.pool.submit(_detect_frame, rgb_image, self.model_detection), context)
+        self.stats['submitted'] += 1
+        return seq
+
+    # Devolve, na ordem da captura, (contexto, caixas) dos frames já detectados.
+    # block=True espera ao menos um frame terminar; wait_all=True espera todos.
+    def completed(self, block=False, wait_all=False):
+        if self._futures and (block or wait_all):
+            futures = [future for future, _ in self._futures.values()]
+            wait(futures, return_when='ALL_COMPLETED' if wait_all else 'FIRST_COMPLETED')
+        for seq in [seq for seq, (future, _) in self._futures.items() if future.done()]:
+            future, context = self._futures.pop(seq)
+            try:
+                boxes = future.result()
+            except Exception as e:
+                print(f"[ERRO] Falha na detecção de um frame: {e}")
+                boxes = []
+            self._order.put(seq, (context, boxes))
+        ready = self._order.pop_ready()
+        self.stats['completed'] += len(ready)
+        return ready
+
+    # Encerra os processos do pool.
+    def close(self):
+        self.pool.shutdown(wait=True)
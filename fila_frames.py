@@ -0,0 +1,214 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : fila_frames.py                                 #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : fila limitada entre detecção e reconhecimento, #
+#             descartando frames velhos                      #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v3.py                                      #
+# rec_facial_fast_v4.py                                      #
+# rec_facial_fast_v5.py                                      #
+# fila_frames.py                                             #
+# -----------------------------------------------------------#
+# Substitui o Queue() sem limite. Cada item guarda o instante da captura.
+# Políticas quando a fila está cheia:
+#   'drop_oldest' : descarta o item mais antigo para abrir espaço
+#   'drop_newest' : descarta o item que está chegando
+# Com max_age_ms, itens mais velhos que isso são descartados (na entrada e
+# na saída), então a saudação nunca sai segundos depois da pessoa passar.
+# O None (sinal de fim) nunca é descartado.
+# Mesma interface usada nos scripts: put, get(timeout) com Empty, task_done e join.
+#
+# ReorderBuffer: quando vários workers processam frames em paralelo, os
+# resultados chegam fora de ordem. Cada frame recebe um número de sequência
+# (reserve) e os resultados só saem (pop_ready) na ordem da captura.
+#
+# FairChannel: várias câmeras alimentando o mesmo reconhecimento. Cada fonte
+# tem a sua FrameChannel (limite, descarte e prazo próprios) e o get() atende
+# as fontes em rodízio, então uma câmera movimentada não deixa as outras
+# esperando. close() avisa o fim: get() devolve None quando todas esvaziarem.
+
+import time
+import threading
+from collections import deque
+from queue import Empty
+
+DROP_POLICIES = ('drop_oldest', 'drop_newest')
+
+
+class FrameChannel:
+    def __init__(self, maxsize=2, policy='drop_oldest', max_age_ms=None):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Política de descarte inválida: {policy} (use {DROP_POLICIES})")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.max_age_ms = max_age_ms
+        self.stats = {'put': 0, 'got': 0, 'dropped_oldest': 0, 'dropped_newest': 0, 'dropped_stale': 0, 'max_depth': 0}
+        self._items = deque()  # (instante da captura, item)
+        self._condition = threading.Condition()
+        self._unfinished = 0
+
+    # Quantidade de itens esperando na fila.
+    def qsize(self):
+        with self._condition:
+            return len(self._items)
+
+    def _is_stale(self, captured_at, now):
+        return self.max_age_ms is not None and (now - captured_at) * 1000.0 > self.max_age_ms
+
+    # Descarta um item sem processar (conta como tarefa concluída para o join).
+    def _discard(self, counter):
+        self.stats[counter] += 1
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._condition.notify_all()
+
+    # Remove do começo da fila os itens que passaram do prazo.
+    def _drop_stale(self, now):
+        while self._items and self._items[0][1] is not None and self._is_stale(self._items[0][0], now):
+            self._items.popleft()
+            self._discard('dropped_stale')
+
+    # Coloca um item na fila. captured_at é o instante da captura (time.time()).
+    def put(self, item, captured_at=None):
+        now = time.time()
+        captured_at = now if captured_at is None else captured_at
+        with self._condition:
+            self.stats['put'] += 1
+            self._unfinished += 1
+            if item is not None:
+                if self._is_stale(captured_at, now):
+                    self._discard('dropped_stale')
+                    return False
+                self._drop_stale(now)
+                if len(self._items) >= self.maxsize:
+                    # Descarta o mais antigo que não seja o None; se só houver Nones, descarta o que chega.
+                    oldest = next((i for i, (_, queued) in enumerate(self._items) if queued is not None), None)
+                    if self.policy == 'drop_newest' or oldest is None:
+                        self._discard('dropped_newest')
+                        return False
+                    del self._items[oldest]
+                    self._discard('dropped_oldest')
+            self._items.append((captured_at, item))
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(self._items))
+            self._condition.notify_all()
+            return True
+
+    # Retira o item mais antigo ainda dentro do prazo. Levanta Empty após timeout.
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while True:
+                self._drop_stale(time.time())
+                if self._items:
+                    self.stats['got'] += 1
+                    return self._items.popleft()[1]
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                self._condition.wait(remaining)
+
+    # Marca o último item retirado como processado.
+    def task_done(self):
+        with self._condition:
+            self._unfinished -= 1
+            if self._unfinished == 0:
+                self._condition.notify_all()
+
+    # Espera todos os itens colocados serem processados ou descartados.
+    def join(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._unfinished <= 0)
+
+
+class ReorderBuffer:
+    def __init__(self):
+        self._next_seq = 0   # próximo número de sequência a distribuir
+        self._next_emit = 0  # próximo número de sequência a entregar
+        self._done = {}      # seq -> resultado pronto fora de ordem
+
+    # Reserva o número de sequência do próximo frame.
+    def reserve(self):
+        seq = self._next_seq
+        self._next_seq += 1
+        return seq
+
+    # Guarda o resultado do frame 'seq'.
+    def put(self, seq, item):
+        self._done[seq] = item
+
+    # Devolve, em ordem, os resultados que já podem sair (sem buracos antes deles).
+    def pop_ready(self):
+        ready = []
+        while self._next_emit in self._done:
+            ready.append(self._done.pop(self._next_emit))
+            self._next_emit += 1
+        return ready
+
+    # Frames reservados que ainda não saíram.
+    def pending(self):
+        return self._next_seq - self._next_emit
+
+
+class FairChannel:
+    def __init__(self, sources, maxsize=2, policy='drop_oldest', max_age_ms=None):
+        self.channels = {source: FrameChannel(maxsize, policy, max_age_ms) for source in sources}
+        self.served = {source: 0 for source in self.channels}
+        self._order = list(self.channels)
+        self._next = 0
+        self._condition = threading.Condition()
+        self._version = 0  # Muda a cada put; evita perder o aviso entre a busca e a espera.
+        self._closed = False
+
+    # Coloca um item na fila da fonte. Mesmo retorno de FrameChannel.put.
+    def put(self, source, item, captured_at=None):
+        accepted = self.channels[source].put(item, captured_at)
+        with self._condition:
+            self._version += 1
+            self._condition.notify_all()
+        return accepted
+
+    # Retira (fonte, item) da próxima fonte com frames, em rodízio. Devolve None
+    # depois do close() quando não há mais nada; levanta Empty após timeout.
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._condition:
+                version, closed = self._version, self._closed
+            for i in range(len(self._order)):
+                source = self._order[(self._next + i) % len(self._order)]
+                try:
+                    item = self.channels[source].get(timeout=0)
+                except Empty:
+                    continue
+                self._next = (self._next + i + 1) % len(self._order)
+                self.served[source] += 1
+                return source, item
+            if closed:
+                return None
+            with self._condition:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                self._condition.wait_for(lambda: self._version != version or self._closed, remaining)
+
+    def task_done(self, source):
+        self.channels[source].task_done()
+
+    def qsize(self, source=None):
+        if source is not None:
+            return self.channels[source].qsize()
+        return sum(channel.qsize() for channel in self.channels.values())
+
+    # Nenhuma fonte vai mandar mais frames.
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    # Espera todos os itens de todas as fontes serem processados ou descartados.
+    def join(self):
+        for channel in self.channels.values():
+            channel.join()
@@ -0,0 +1,135 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : formato_galeria.py                             #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : arquivo binário da galeria (substitui o        #
+#             encodings.pkl) lido com numpy.memmap           #
+#                                                            #
+# arquivos desse sistema:                                    #
+# main.py                                                    #
+# rec_facial_*.py                                            #
+# galeria.py                                                 #
+# formato_galeria.py                                         #
+# -----------------------------------------------------------#
+#USO
+
+# Conversão do pickle antigo para o formato binário:
+#python formato_galeria.py /home/felipe/encodings.pkl /home/felipe/encodings.gal
+
+# Layout do arquivo (little-endian):
+#   cabeçalho  : magic, versão, dimensão, nº de usuários, nº de vetores,
+#                offset/tamanho da tabela, offset do bloco de vetores
+#   tabela     : JSON UTF-8 com name/audio/item de cada usuário e a faixa
+#                (start, count) das suas linhas no bloco de vetores
+#   vetores    : float32 (nº de vetores x dimensão), alinhado em página
+# O bloco de vetores é mapeado com numpy.memmap: a abertura não copia nada
+# e as páginas ficam no cache do sistema, compartilhadas entre processos.
+# A gravação é feita num arquivo temporário trocado com os.replace, então
+# quem já mapeou o arquivo antigo continua lendo uma versão consistente.
+
+import os
+import sys
+import json
+import pickle
+import struct
+import numpy as np
+
+MAGIC = b'RFGALLRY'
+FORMAT_VERSION = 1
+ENCODING_SIZE = 128
+HEADER = struct.Struct('<8sIIIIQQQ')
+ALIGNMENT = 4096  # Alinhamento do bloco de vetores (tamanho de página).
+
+
+# Função que grava os usuários (mesmo formato do pickle: name/audio/item/encodings) no arquivo binário.
+def write_gallery(path, users):
+    table = []
+    blocks = []
+    start = 0
+    for user in users:
+        vectors = np.asarray(user['encodings'], dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        table.append({'name': user['name'], 'audio': user.get('audio', ''), 'item': user.get('item', ''),
+                      'start': start, 'count': len(vectors)})
+        blocks.append(vectors)
+        start += len(vectors)
+
+    table_bytes = json.dumps(table, ensure_ascii=False).encode('utf-8')
+    table_offset = HEADER.size
+    vectors_offset = -(-(table_offset + len(table_bytes)) // ALIGNMENT) * ALIGNMENT
+    vectors = np.concatenate(blocks) if blocks else np.empty((0, ENCODING_SIZE), dtype=np.float32)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, ENCODING_SIZE, len(table), len(vectors),
+                            table_offset, len(table_bytes), vectors_offset))
+        f.write(table_bytes)
+        f.write(b'\0' * (vectors_offset - table_offset - len(table_bytes)))
+        f.write(np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)  # Troca atômica do arquivo.
+
+
+# Função que abre o arquivo binário. Retorna a tabela de usuários (name, audio,
+# item, start, count) e a matriz de vetores mapeada em memória (somente leitura).
+def read_gallery(path):
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"Arquivo de galeria inválido: {path}")
+        magic, version, dim, num_users, num_vectors, table_offset, table_size, vectors_offset = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo de galeria inválido: {path}")
+        if version != FORMAT_VERSION or dim != ENCODING_SIZE:
+            raise ValueError(f"Versão {version} (dimensão {dim}) do arquivo de galeria não suportada: {path}")
+        f.seek(table_offset)
+        table = json.loads(f.read(table_size).decode('utf-8'))
+
+    if len(table) != num_users:
+        raise ValueError(f"Tabela de usuários corrompida: {path}")
+    if num_vectors == 0:
+        return table, np.empty((0, ENCODING_SIZE), dtype=np.float32)
+    vectors = np.memmap(path, dtype='<f4', mode='r', offset=vectors_offset, shape=(num_vectors, ENCODING_SIZE))
+    return table, vectors
+
+
+# Função que carrega os usuários no mesmo formato do pickle (lista de dicionários).
+# Aceita tanto o arquivo binário quanto o encodings.pkl antigo; no binário,
+# 'encodings' de cada usuário é uma fatia da matriz mapeada (sem cópia).
+def load_users(path):
+    if path.endswith('.pkl'):
+        with open(path, 'rb') as f:
+            return pickle.load(f)['users']
+
+    table, vectors = read_gallery(path)
+    return [{'name': entry['name'], 'audio': entry['audio'], 'item': entry['item'],
+             'encodings': vectors[entry['start']:entry['start'] + entry['count']]} for entry in table]
+
+
+# Função que escolhe o arquivo da galeria a abrir: se o encodings.gal ainda não
+# existe (main.py antigo, sem conversão) mas o encodings.pkl ao lado existe,
+# usa o pickle (load_users e galeria.load_gallery aceitam os dois formatos).
+def resolve_gallery_file(path):
+    if os.path.exists(path):
+        return path
+    pickle_file = os.path.splitext(path)[0] + '.pkl'
+    if os.path.exists(pickle_file):
+        print(f"Arquivo {path} não encontrado, usando {pickle_file}")
+        return pickle_file
+    return path
+
+
+# Função que converte o encodings.pkl antigo para o formato binário.
+def convert_pickle(pickle_file, gallery_file):
+    users = load_users(pickle_file)
+    write_gallery(gallery_file, users)
+    return users
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: python formato_galeria.py <encodings.pkl> <encodings.gal>")
+        sys.exit(1)
+    users = convert_pickle(sys.argv[1], sys.argv[2])
+    print(f"{len(users)} usuários gravados em {sys.argv[2]}")
@@ -0,0 +1,336 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : galeria.py                                     #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : comparar rostos com toda a galeria de uma vez  #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# main.py                                                    #
+# galeria.py                                                 #
+# indice_ann.py                                              #
+# formato_galeria.py                                         #
+# -----------------------------------------------------------#
+# A galeria guarda todas as codificações cadastradas numa única matriz
+# contígua float32 (N x 128) e um vetor 'owners' com o índice do usuário
+# dono de cada linha. Assim cada frame é comparado com todos os usuários
+# numa única operação do NumPy, sem o loop em Python por usuário.
+# Cada usuário também tem um centróide e um raio (maior distância do centróide
+# às suas codificações). Pela desigualdade triangular, nenhuma codificação do
+# usuário fica a menos de |q - centróide| - raio do rosto q; se esse limite já
+# passa da tolerância, o usuário inteiro é descartado sem comparar uma a uma.
+# A poda é exata: o resultado é o mesmo da varredura completa.
+# Acima de ANN_MIN_SIZE codificações a galeria também ganha um índice IVF
+# (indice_ann.py) e a busca deixa de ser exata para ser aproximada.
+# Com QUANTIZATION = 'int8' ou 'float16' a primeira passada usa os códigos
+# compactos de quantizacao.py e só os RERANK_SIZE melhores são recalculados
+# em float32. Nesse caso a galeria não guarda a matriz float32 ('encodings'
+# fica None): as linhas da lista curta são lidas do bloco mapeado do .gal
+# ('block', com 'block_rows' nas partições), e só os códigos ficam residentes.
+
+import numpy as np
+from indice_ann import build_index, load_index, ANN_MIN_SIZE
+from quantizacao import quantize, approximate_sq_distances
+from formato_galeria import read_gallery, load_users
+
+ENCODING_SIZE = 128  # Tamanho do vetor gerado pelo face_recognition (dlib).
+PRUNE_MARGIN = 1e-4  # Folga para erros de arredondamento do float32 na poda.
+QUANTIZATION = None  # None (float32), 'float16' ou 'int8'.
+RERANK_SIZE = 16  # Candidatos da primeira passada quantizada que são reavaliados em float32.
+
+
+# Função que monta a galeria a partir da lista 'users' do encodings.pkl.
+# Com keep_lists=False a galeria guarda cópias dos usuários sem as listas
+# 'encodings' (float64 em objetos Python), que podem então ser liberadas.
+def build_gallery(users, index_file=None, ann_min_size=ANN_MIN_SIZE, quantization=QUANTIZATION, keep_lists=True):
+    vectors = []
+    owners = []
+    for index, user in enumerate(users):
+        for encoding in user['encodings']:
+            vectors.append(encoding)
+            owners.append(index)
+
+    encodings = np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    owners = np.asarray(owners, dtype=np.int32)
+    return _assemble_gallery(users, encodings, owners, index_file, ann_min_size, quantization, keep_lists)
+
+
+# Função que monta a galeria direto do arquivo binário (formato_galeria.py).
+# A matriz de codificações continua mapeada em memória, sem cópia.
+# Para o encodings.pkl antigo cai no build_gallery normal.
+def load_gallery(gallery_file, index_file=None, ann_min_size=ANN_MIN_SIZE, quantization=QUANTIZATION, keep_lists=True):
+    if gallery_file.endswith('.pkl'):
+        return build_gallery(load_users(gallery_file), index_file, ann_min_size, quantization, keep_lists)
+
+    table, encodings = read_gallery(gallery_file)
+    owners = np.repeat(np.arange(len(table), dtype=np.int32), [entry['count'] for entry in table])
+    users = []
+    for entry in table:
+        user = {'name': entry['name'], 'audio': entry['audio'], 'item': entry['item']}
+        if keep_lists:
+            user['encodings'] = encodings[entry['start']:entry['start'] + entry['count']]
+        users.append(user)
+    return _assemble_gallery(users, encodings, owners, index_file, ann_min_size, quantization, keep_lists=True,
+                             block=encodings)
+
+
+# Função que separa a partição da galeria de uma porta: só os usuários cujo
+# 'item' (linha de GPIO) está em items. A galeria completa fica em 'parent'
+# para a busca global opcional de match_faces_for_door.
+def partition_gallery(gallery, items, ann_min_size=ANN_MIN_SIZE):
+    if items is None:
+        return gallery
+    items = {str(item) for item in items}
+    selected = [index for index, user in enumerate(gallery['users']) if str(user['item']) in items]
+    new_index = np.full(len(gallery['users']), -1, dtype=np.int32)
+    new_index[selected] = np.arange(len(selected), dtype=np.int32)
+    rows = np.flatnonzero(new_index[gallery['owners']] >= 0)
+    quantized = gallery.get('quantized')
+    block, block_rows = gallery.get('block'), gallery.get('block_rows')
+    partition = _assemble_gallery([gallery['users'][index] for index in selected],
+                                  gallery_rows(gallery, rows), new_index[gallery['owners'][rows]],
+                                  None, ann_min_size, quantized['mode'] if quantized else None, keep_lists=True,
+                                  block=block, block_rows=rows if block_rows is None else block_rows[rows])
+    partition['items'] = items
+    partition['parent'] = gallery
+    return partition
+
+
+# Função que identifica os rostos na partição da porta. Retorna, para cada rosto,
+# (usuário, distância, autorizado). Com fallback=True, quem não foi achado na
+# porta é procurado na galeria completa e volta com autorizado=False
+# ("conhecido, mas sem acesso aqui").
+# Com um IdentityCache (cache_identidades.py), os usuários vistos recentemente
+# são testados antes e a busca completa só roda para os rostos que não bateram.
+def match_faces_for_door(gallery, encodings, tolerance=0.5, fallback=True, cache=None):
+    results = [None] * len(encodings)
+    if cache is not None:
+        for row, encoding in enumerate(encodings):
+            hit = cache.lookup(gallery, encoding, tolerance)
+            if hit is not None:
+                results[row] = (hit[0], hit[1], True)
+
+    pending = [row for row, result in enumerate(results) if result is None]
+    if pending:
+        for row, (user, distance) in zip(pending, match_faces(gallery, [encodings[row] for row in pending], tolerance)):
+            results[row] = (user, distance, user is not None)
+            if cache is not None and user is not None:
+                cache.record(user['name'])
+
+    parent = gallery.get('parent')
+    missing = [row for row, (user, _, _) in enumerate(results) if user is None]
+    if not fallback or parent is None or not missing:
+        return results
+
+    for row, (user, distance) in zip(missing, match_faces(parent, [encodings[row] for row in missing], tolerance)):
+        if user is not None:
+            results[row] = (user, distance, False)
+    return results
+
+
+# Função que calcula as estruturas auxiliares (normas, centróides, índice, códigos) da galeria.
+# 'block' é a matriz de onde as linhas vieram (o bloco mapeado do .gal) e 'block_rows'
+# a posição de cada linha nele (None = mesma posição); só são usados com quantização.
+def _assemble_gallery(users, encodings, owners, index_file, ann_min_size, quantization, keep_lists,
+                      block=None, block_rows=None):
+    encodings = np.ascontiguousarray(encodings)
+    centroids, radii = _user_bounds(encodings, owners, len(users))
+    index = _gallery_index(encodings, owners, len(users), index_file, ann_min_size)
+    if not keep_lists:
+        users = [{key: value for key, value in user.items() if key != 'encodings'} for user in users]
+    if quantization and block is None:
+        block, block_rows = encodings, None  # Sem arquivo (encodings.pkl): a matriz é a própria fonte.
+    return {
+        'users': users,
+        # Com quantização a matriz float32 não fica na galeria; ver gallery_rows().
+        'encodings': None if quantization else encodings,
+        'block': block if quantization else None,
+        'block_rows': block_rows if quantization else None,
+        'owners': owners,
+        # Normas ao quadrado pré-calculadas, usadas no cálculo em lote da distância.
+        'sq_norms': np.einsum('ij,ij->i', encodings, encodings),
+        'centroids': centroids,
+        'centroid_sq_norms': np.einsum('ij,ij->i', centroids, centroids),
+        'radii': radii,
+        # Faixa de linhas de cada usuário (owners é crescente) e busca por nome.
+        'offsets': np.searchsorted(owners, np.arange(len(users) + 1)).astype(np.int64),
+        'name_index': {user['name']: position for position, user in enumerate(users)},
+        'index': index,
+        'quantized': quantize(encodings, quantization) if quantization else None,
+        # Contador de distâncias calculadas (diagnóstico da poda).
+        'stats': {'distance_evaluations': 0},
+    }
+
+
+# Função que devolve, em float32, as linhas 'rows' das codificações da galeria.
+# Na galeria quantizada lê só essas linhas do bloco mapeado em memória.
+def gallery_rows(gallery, rows):
+    if gallery['encodings'] is not None:
+        return gallery['encodings'][rows]
+    block_rows = gallery['block_rows']
+    return np.asarray(gallery['block'][rows if block_rows is None else block_rows[rows]], dtype=np.float32)
+
+
+# Função que calcula o centróide e o raio de cada usuário.
+# Usuários sem codificações ficam com raio -inf e nunca são candidatos.
+def _user_bounds(encodings, owners, num_users):
+    centroids = np.zeros((num_users, ENCODING_SIZE), dtype=np.float32)
+    radii = np.full(num_users, -np.inf, dtype=np.float32)
+    counts = np.bincount(owners, minlength=num_users)
+    filled = counts > 0
+    if not filled.any():
+        return centroids, radii
+
+    # As linhas de cada usuário são contíguas ('owners' é crescente).
+    starts = (np.cumsum(counts) - counts)[filled]
+    centroids[filled] = np.add.reduceat(encodings, starts, axis=0) / counts[filled, None]
+    spread = np.linalg.norm(encodings - centroids[owners], axis=1)
+    radii[filled] = np.maximum.reduceat(spread, starts)
+    return centroids, radii
+
+
+# Função que devolve o índice IVF da galeria (ou None para busca exata).
+# Reaproveita o índice salvo pelo main.py quando ele corresponde ao pickle.
+def _gallery_index(encodings, owners, num_users, index_file, ann_min_size):
+    if ann_min_size is None or len(encodings) < ann_min_size:
+        return None
+    if index_file is not None:
+        index = load_index(index_file)
+        if index is not None and index.size == len(encodings):
+            _, ids = index.all_vectors()
+            if len(ids) == 0 or ids.max() < num_users:
+                return index
+    return build_index(encodings, owners)
+
+
+# Função que calcula a distância euclidiana entre cada rosto (linhas) e
+# cada codificação da galeria (colunas) numa única multiplicação de matrizes.
+def face_distances(gallery, encodings):
+    queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    if len(gallery['owners']) == 0:
+        return np.empty((len(queries), 0), dtype=np.float32)
+    gallery['stats']['distance_evaluations'] += len(queries) * len(gallery['owners'])
+    return _distances(queries, gallery_rows(gallery, slice(None)), gallery['sq_norms'])
+
+
+# |a - b|^2 = |a|^2 + |b|^2 - 2ab, com as normas da galeria já calculadas.
+def _distances(queries, vectors, sq_norms):
+    sq = np.einsum('ij,ij->i', queries, queries)[:, None] + sq_norms[None, :]
+    sq -= 2.0 * (queries @ vectors.T)
+    np.maximum(sq, 0.0, out=sq)  # Evita valores negativos por arredondamento.
+    return np.sqrt(sq)
+
+
+# Função que identifica todos os rostos de um frame de uma só vez.
+# Retorna, para cada rosto, o usuário mais próximo (ou None) e a distância.
+# Mesmo critério do face_recognition.compare_faces: distância <= tolerance.
+# Com prune=True os usuários fora do alcance são descartados pelo centróide/raio.
+def match_faces(gallery, encodings, tolerance=0.5, prune=True):
+    if gallery.get('index') is not None:
+        return _match_faces_index(gallery, encodings, tolerance)
+    if gallery.get('quantized') is not None:
+        return _match_faces_quantized(gallery, encodings, tolerance, prune=prune)
+    if prune:
+        return _match_faces_pruned(gallery, encodings, tolerance)
+
+    distances = face_distances(gallery, encodings)
+    if distances.shape[1] == 0:
+        return [(None, float('inf')) for _ in range(len(distances))]
+
+    best = np.argmin(distances, axis=1)
+    results = []
+    for row, column in enumerate(best):
+        distance = float(distances[row, column])
+        if distance <= tolerance:
+            user = gallery['users'][gallery['owners'][column]]
+            results.append((user, distance))
+        else:
+            results.append((None, distance))
+    return results
+
+
+# Mesma saída de match_faces, mas usando o índice IVF (busca aproximada).
+def _match_faces_index(gallery, encodings, tolerance):
+    distances, ids = gallery['index'].search(encodings, k=1)
+    results = []
+    for distance, user_index in zip(distances[:, 0], ids[:, 0]):
+        distance = float(distance)
+        if user_index >= 0 and distance <= tolerance:
+            results.append((gallery['users'][user_index], distance))
+        else:
+            results.append((None, distance))
+    return results
+
+
+# Mesma saída de match_faces, comparando só as codificações dos usuários cujo
+# limite inferior (|q - centróide| - raio) não passa da tolerância.
+def _match_faces_pruned(gallery, encodings, tolerance):
+    queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    if len(gallery['owners']) == 0:
+        return [(None, float('inf')) for _ in range(len(queries))]
+
+    lower = _distances(queries, gallery['centroids'], gallery['centroid_sq_norms']) - gallery['radii']
+    evaluations = lower.size
+    results = []
+    for query, user_lower in zip(queries, lower):
+        candidates = user_lower <= tolerance + PRUNE_MARGIN
+        rows = np.flatnonzero(candidates[gallery['owners']])
+        if len(rows) == 0:
+            # Todos podados: como na varredura completa, "Unknown" com uma distância finita
+            # acima da tolerância (o menor limite inferior, que nunca passa da distância real).
+            results.append((None, float(user_lower[np.isfinite(user_lower)].min())))
+            continue
+
+        evaluations += len(rows)
+        distances = _distances(query[None, :], gallery_rows(gallery, rows), gallery['sq_norms'][rows])[0]
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance <= tolerance:
+            results.append((gallery['users'][gallery['owners'][rows[best]]], distance))
+        else:
+            results.append((None, distance))
+    gallery['stats']['distance_evaluations'] += evaluations
+    return results
+
+
+# Mesma saída de match_faces: a poda por centróide/raio roda antes (com prune=True),
+# a primeira passada nos códigos quantizados só olha as linhas dos usuários que
+# sobraram e os RERANK_SIZE candidatos mais próximos são reavaliados em float32.
+def _match_faces_quantized(gallery, encodings, tolerance, rerank=RERANK_SIZE, prune=True):
+    queries = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    if len(gallery['owners']) == 0:
+        return [(None, float('inf')) for _ in range(len(queries))]
+
+    if prune:
+        lower = _distances(queries, gallery['centroids'], gallery['centroid_sq_norms']) - gallery['radii']
+        evaluations = lower.size
+    else:
+        lower, evaluations = None, 0
+    results = []
+    for row, query in enumerate(queries):
+        if lower is None:
+            rows = None
+        else:
+            rows = np.flatnonzero((lower[row] <= tolerance + PRUNE_MARGIN)[gallery['owners']])
+            if len(rows) == 0:
+                # Todos podados: "Unknown" com o menor limite inferior, como em _match_faces_pruned.
+                results.append((None, float(lower[row][np.isfinite(lower[row])].min())))
+                continue
+
+        approximate = approximate_sq_distances(gallery['quantized'], query[None, :], rows)[0]
+        top = min(rerank, len(approximate))
+        shortlist = np.argpartition(approximate, top - 1)[:top]
+        if rows is not None:
+            shortlist = rows[shortlist]
+        # Só as linhas da lista curta são lidas em float32 (do bloco mapeado).
+        distances = _distances(query[None, :], gallery_rows(gallery, shortlist), gallery['sq_norms'][shortlist])[0]
+        evaluations += len(approximate) + len(shortlist)
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance <= tolerance:
+            results.append((gallery['users'][gallery['owners'][shortlist[best]]], distance))
+        else:
+            results.append((None, distance))
+    gallery['stats']['distance_evaluations'] += evaluations
+    return results
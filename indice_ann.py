@@ -0,0 +1,385 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : indice_ann.py                                  #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : busca aproximada (IVF) para galerias grandes   #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# main.py                                                    #
+# galeria.py                                                 #
+# indice_ann.py                                              #
+# -----------------------------------------------------------#
+# Índice IVF (inverted file): as codificações são agrupadas por k-means em
+# 'nlist' listas. Na busca, só as 'nprobe' listas com centróide mais próximo
+# do rosto são comparadas, em vez da galeria inteira.
+# Cada vetor guarda o índice do usuário dono (posição em data['users']),
+# que é estável porque o main.py só acrescenta usuários no fim da lista.
+# Se o faiss estiver instalado, ele é usado para acelerar a busca; os dados
+# do índice continuam no formato NumPy abaixo (é isso que vai para o disco).
+# No disco: o .npz com o índice do último treino e, ao lado, um diário (.log)
+# só de acréscimos com as alterações feitas depois dele. Um cadastro acrescenta
+# ao diário os vetores novos (cada um vai para a lista do centróide mais
+# próximo), sem regravar o .npz. O k-means só roda de novo, e o .npz só é
+# regravado, depois de RETRAIN_ADDITIONS vetores acrescentados ou quando o
+# desequilíbrio das listas (maior lista / tamanho médio) passa de
+# MAX_IMBALANCE_GROWTH vezes o medido logo após o treino. Para decidir isso o
+# cadastro lê só os centróides, os tamanhos das listas e os donos (load_summary),
+# nunca os vetores do .npz. Galerias com menos de ANN_MIN_SIZE codificações não
+# usam índice, então o cadastro nem o mantém.
+
+import os
+import numpy as np
+
+try:
+    import faiss  # Opcional: backend mais rápido para a busca.
+except ImportError:
+    faiss = None
+
+ENCODING_SIZE = 128
+INDEX_VERSION = 1
+KMEANS_ITERATIONS = 10
+ANN_MIN_SIZE = 20000  # Abaixo disso a busca exata em lote é mais rápida que o índice.
+RETRAIN_ADDITIONS = 2000  # Vetores acrescentados desde o último treino que pedem um novo k-means.
+MAX_IMBALANCE_GROWTH = 2.0  # Crescimento do desequilíbrio das listas que pede um novo k-means.
+# Registro do diário: op = 1 acrescenta o vetor ao dono 'id', op = -1 remove todos os vetores do dono.
+LOG_RECORD = np.dtype([('op', '<i4'), ('id', '<i4'), ('vector', '<f4', ENCODING_SIZE)])
+
+
+# Função que calcula a distância euclidiana ao quadrado entre dois conjuntos de vetores.
+def _squared_distances(queries, vectors):
+    sq = np.einsum('ij,ij->i', queries, queries)[:, None] + np.einsum('ij,ij->i', vectors, vectors)[None, :]
+    sq -= 2.0 * (queries @ vectors.T)
+    np.maximum(sq, 0.0, out=sq)
+    return sq
+
+
+# Função que escolhe o número de listas de acordo com o tamanho da galeria.
+def default_nlist(size):
+    return max(1, int(4 * np.sqrt(size)))
+
+
+class IVFIndex:
+    def __init__(self, nlist, nprobe=8, use_faiss=True):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.use_faiss = use_faiss and faiss is not None
+        self.centroids = None  # Sem treino, tudo fica numa única lista (busca exata).
+        self.lists = [np.empty((0, ENCODING_SIZE), dtype=np.float32)]
+        self.list_ids = [np.empty(0, dtype=np.int32)]
+        self.trained_size = 0
+        self.added_since_train = 0
+        self.trained_imbalance = 1.0
+        self._faiss_index = None
+
+    @property
+    def size(self):
+        return sum(len(ids) for ids in self.list_ids)
+
+    # Treina os centróides com k-means e redistribui os vetores já inseridos.
+    def train(self, vectors, seed=0):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        nlist = min(self.nlist, len(vectors))
+        if nlist < 1:
+            return
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmin(_squared_distances(vectors, centroids), axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            counts = np.bincount(assignment, minlength=nlist)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        all_vectors, all_ids = self.all_vectors()
+        self.centroids = centroids
+        self.nlist = nlist
+        self.trained_size = len(vectors)
+        self.lists = [np.empty((0, ENCODING_SIZE), dtype=np.float32) for _ in range(nlist)]
+        self.list_ids = [np.empty(0, dtype=np.int32) for _ in range(nlist)]
+        self._faiss_index = None
+        if len(all_ids):
+            self.add(all_vectors, all_ids)
+        self.added_since_train = 0
+        self.trained_imbalance = self.imbalance()
+
+    # Insere novos vetores (inserção incremental, sem novo treino).
+    def add(self, vectors, ids):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        ids = np.asarray(ids, dtype=np.int32).reshape(-1)
+        if len(ids) == 0:
+            return
+        if self.centroids is None:
+            assignment = np.zeros(len(ids), dtype=np.int64)
+        else:
+            assignment = np.argmin(_squared_distances(vectors, self.centroids), axis=1)
+        for list_no in np.unique(assignment):
+            selected = assignment == list_no
+            self.lists[list_no] = np.concatenate([self.lists[list_no], vectors[selected]])
+            self.list_ids[list_no] = np.concatenate([self.list_ids[list_no], ids[selected]])
+        if self.centroids is not None:
+            self.added_since_train += len(ids)
+        if self._faiss_index is not None:
+            self._faiss_index.add_with_ids(vectors, ids.astype(np.int64))
+
+    # Remove todos os vetores dos donos informados (usado quando um usuário é recompactado).
+    def remove_ids(self, ids):
+        ids = np.asarray(ids, dtype=np.int32)
+        for list_no, list_ids in enumerate(self.list_ids):
+            keep = ~np.isin(list_ids, ids)
+            if not keep.all():
+                self.lists[list_no] = self.lists[list_no][keep]
+                self.list_ids[list_no] = list_ids[keep]
+                self._faiss_index = None  # O espelho do faiss é refeito na próxima busca.
+
+    # Maior lista / tamanho médio das listas (1.0 = listas do mesmo tamanho).
+    def imbalance(self):
+        return _imbalance([len(list_ids) for list_ids in self.list_ids])
+
+    # O índice precisa de um novo k-means? (muitos acréscimos ou listas desequilibradas)
+    def needs_training(self):
+        return _needs_training(self.centroids is not None, [len(list_ids) for list_ids in self.list_ids],
+                               self.added_since_train, self.trained_imbalance)
+
+    # Busca os k vizinhos mais próximos de cada rosto.
+    # Retorna (distâncias, ids) com formato (num_rostos, k); -1 quando não há vizinho.
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if self.use_faiss and self.centroids is not None:
+            return self._faiss_search(queries, k)
+
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int32)
+        if self.centroids is None:
+            probes = np.zeros((len(queries), 1), dtype=np.int64)
+        else:
+            nprobe = min(self.nprobe, self.nlist)
+            coarse = _squared_distances(queries, self.centroids)
+            probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        for row, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[p] for p in probes[row]])
+            if len(candidates) == 0:
+                continue
+            candidate_ids = np.concatenate([self.list_ids[p] for p in probes[row]])
+            sq = _squared_distances(query[None, :], candidates)[0]
+            top = min(k, len(sq))
+            best = np.argpartition(sq, top - 1)[:top]
+            best = best[np.argsort(sq[best])]
+            distances[row, :top] = np.sqrt(sq[best])
+            ids[row, :top] = candidate_ids[best]
+        return distances, ids
+
+    def _faiss_search(self, queries, k):
+        if self._faiss_index is None:
+            quantizer = faiss.IndexFlatL2(ENCODING_SIZE)
+            quantizer.add(self.centroids)
+            index = faiss.IndexIVFFlat(quantizer, ENCODING_SIZE, self.nlist)
+            index.train(self.centroids)  # O quantizador já está treinado; não recalcula centróides.
+            all_vectors, all_ids = self.all_vectors()
+            index.add_with_ids(all_vectors, all_ids.astype(np.int64))
+            self._faiss_index = index
+        self._faiss_index.nprobe = min(self.nprobe, self.nlist)
+        sq, ids = self._faiss_index.search(queries, k)
+        distances = np.sqrt(np.maximum(sq, 0.0)).astype(np.float32)
+        distances[ids < 0] = np.inf
+        return distances, ids.astype(np.int32)
+
+    # Retorna todos os vetores do índice e os respectivos donos.
+    def all_vectors(self):
+        return np.concatenate(self.lists), np.concatenate(self.list_ids)
+
+    # Salva o índice num arquivo .npz (formato NumPy, independente do faiss).
+    def save(self, path):
+        vectors, ids = self.all_vectors()
+        list_sizes = np.array([len(list_ids) for list_ids in self.list_ids], dtype=np.int64)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, version=INDEX_VERSION, nlist=self.nlist, nprobe=self.nprobe,
+                     trained_size=self.trained_size, added_since_train=self.added_since_train,
+                     trained_imbalance=self.trained_imbalance,
+                     centroids=self.centroids if self.centroids is not None else np.empty((0, ENCODING_SIZE), dtype=np.float32),
+                     vectors=vectors, ids=ids, list_sizes=list_sizes)
+        os.replace(tmp_path, path)  # Troca atômica: o reconhecedor nunca lê um arquivo pela metade.
+        # O .npz já contém tudo o que estava no diário. Quem ler o .npz novo com o
+        # diário antigo só reaplica remoções + acréscimos dos mesmos donos (idempotente).
+        if os.path.exists(log_path(path)):
+            os.remove(log_path(path))
+
+
+def _imbalance(list_sizes):
+    sizes = np.asarray(list_sizes)
+    return float(sizes.max() / sizes.mean()) if sizes.sum() else 1.0
+
+
+def _needs_training(trained, list_sizes, added_since_train, trained_imbalance):
+    if not trained:
+        return sum(list_sizes) > 0
+    return (added_since_train >= RETRAIN_ADDITIONS
+            or _imbalance(list_sizes) > MAX_IMBALANCE_GROWTH * trained_imbalance)
+
+
+# Caminho do diário de acréscimos de um índice salvo.
+def log_path(path):
+    return path + '.log'
+
+
+# Função que acrescenta ao diário a troca dos vetores de um dono: remove os antigos e
+# insere 'vectors'. O arquivo só cresce; um registro cortado no fim é ignorado na leitura.
+def append_log(path, owner, vectors):
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    records = np.zeros(len(vectors) + 1, dtype=LOG_RECORD)
+    records['op'] = 1
+    records['id'] = owner
+    records[0]['op'] = -1
+    records['vector'][1:] = vectors
+    with open(log_path(path), 'ab') as f:
+        partial = f.tell() % LOG_RECORD.itemsize
+        if partial:
+            f.truncate(f.tell() - partial)  # Registro cortado por uma gravação interrompida.
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# Função que lê o diário em grupos de registros seguidos com a mesma operação:
+# (op, donos, vetores). Um registro cortado no fim é ignorado.
+def _read_log(path):
+    with open(log_path(path), 'rb') as f:
+        data = f.read()
+    records = np.frombuffer(data[:len(data) - len(data) % LOG_RECORD.itemsize], dtype=LOG_RECORD)
+    start = 0
+    while start < len(records):
+        op = records['op'][start]
+        end = start + 1
+        while end < len(records) and records['op'][end] == op:
+            end += 1
+        yield op, records['id'][start:end], records['vector'][start:end]
+        start = end
+
+
+# Função que reaplica no índice, em ordem, as alterações do diário.
+def _replay_log(index, path):
+    for op, ids, vectors in _read_log(path):
+        if op < 0:
+            index.remove_ids(ids)
+        else:
+            index.add(vectors, ids)
+
+
+# Função que carrega um índice salvo com IVFIndex.save. Retorna None se o arquivo não existir ou for de outra versão.
+def load_index(path, use_faiss=True):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data['version']) != INDEX_VERSION:
+            return None
+        index = IVFIndex(int(data['nlist']), int(data['nprobe']), use_faiss=use_faiss)
+        index.trained_size = int(data['trained_size'])
+        if 'added_since_train' in data.files:
+            index.added_since_train = int(data['added_since_train'])
+            index.trained_imbalance = float(data['trained_imbalance'])
+        if len(data['centroids']):
+            index.centroids = data['centroids']
+        offsets = np.cumsum(data['list_sizes'])[:-1]
+        index.lists = np.split(data['vectors'], offsets)
+        index.list_ids = np.split(data['ids'], offsets)
+    if os.path.exists(log_path(path)):
+        _replay_log(index, path)
+    return index
+
+
+# Função que lê o resumo de um índice salvo, sem os vetores (os membros do .npz
+# são lidos só quando acessados): centróides, tamanho de cada lista e as listas
+# dos vetores de cada dono, já com o diário aplicado. Retorna None se o arquivo
+# não existir ou for de outra versão.
+def load_summary(path):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data['version']) != INDEX_VERSION or 'added_since_train' not in data.files:
+            return None
+        summary = {
+            'centroids': data['centroids'] if len(data['centroids']) else None,
+            'list_sizes': data['list_sizes'].astype(np.int64),
+            'added_since_train': int(data['added_since_train']),
+            'trained_imbalance': float(data['trained_imbalance']),
+        }
+        ids = data['ids']
+    lists = np.repeat(np.arange(len(summary['list_sizes'])), summary['list_sizes'])
+    order = np.argsort(ids, kind='stable')
+    owners, starts = np.unique(ids[order], return_index=True)
+    summary['owner_lists'] = dict(zip(owners.tolist(), np.split(lists[order], starts[1:])))
+    if os.path.exists(log_path(path)):
+        for op, ids, vectors in _read_log(path):
+            if op < 0:
+                for owner in ids.tolist():
+                    _summary_replace(summary, owner, [])
+            else:
+                for owner in np.unique(ids).tolist():
+                    _summary_add(summary, owner, vectors[ids == owner])
+    return summary
+
+
+# Acrescenta ao resumo os vetores de um dono (cada um na lista do centróide mais próximo).
+def _summary_add(summary, owner, vectors):
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    if len(vectors) == 0:
+        return
+    if summary['centroids'] is None:
+        lists = np.zeros(len(vectors), dtype=np.int64)
+    else:
+        lists = np.argmin(_squared_distances(vectors, summary['centroids']), axis=1)
+        summary['added_since_train'] += len(vectors)
+    np.add.at(summary['list_sizes'], lists, 1)
+    previous = summary['owner_lists'].get(owner)
+    summary['owner_lists'][owner] = lists if previous is None else np.concatenate([previous, lists])
+
+
+# Troca no resumo os vetores de um dono (remove os antigos e acrescenta 'vectors').
+def _summary_replace(summary, owner, vectors):
+    previous = summary['owner_lists'].pop(owner, None)
+    if previous is not None:
+        np.subtract.at(summary['list_sizes'], previous, 1)
+    _summary_add(summary, owner, vectors)
+
+
+# Função que monta um índice treinado a partir das codificações e dos donos (índices dos usuários).
+def build_index(encodings, owners, nlist=None, nprobe=8, use_faiss=True):
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+    index = IVFIndex(nlist or default_nlist(len(encodings)), nprobe, use_faiss=use_faiss)
+    index.add(encodings, owners)
+    index.train(encodings)
+    return index
+
+
+# Função usada pelo main.py no /upload/ (e pela compactação): registra no diário a
+# troca dos vetores dos usuários alterados (users[i] para i em user_indices), sem
+# ler nem regravar os vetores do .npz. Se o arquivo não bater com a galeria, ou se
+# o índice precisar de novo treino, o índice é refeito e salvo inteiro.
+# Abaixo de min_size codificações não há índice (os reconhecedores fazem a busca exata).
+# Retorna o índice quando ele é refeito; None quando só o diário muda (ou não há índice).
+def update_index_file(index_file, users, user_indices, min_size=ANN_MIN_SIZE):
+    user_indices = [user_indices] if isinstance(user_indices, int) else list(user_indices)
+    total = sum(len(user['encodings']) for user in users)
+    if min_size is not None and total < min_size:
+        return None
+    summary = load_summary(index_file)
+    if summary is not None:
+        for user_index in user_indices:
+            _summary_replace(summary, user_index, users[user_index]['encodings'])
+        if summary['list_sizes'].sum() != total or _needs_training(
+                summary['centroids'] is not None, summary['list_sizes'],
+                summary['added_since_train'], summary['trained_imbalance']):
+            summary = None
+    if summary is None:
+        vectors = [encoding for user in users for encoding in user['encodings']]
+        owners = [i for i, user in enumerate(users) for _ in user['encodings']]
+        index = build_index(vectors, owners)
+        index.save(index_file)
+        return index
+    for user_index in user_indices:
+        append_log(index_file, user_index, users[user_index]['encodings'])
+    return None
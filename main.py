@@ -17,13 +17,16 @@
 #uvicorn main:app --reload --host 0.0.0.0 --port 8000
 
 import os
-import pickle  # Usado para serialização e desserialização de dados.
 import face_recognition
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from typing import List
 import uvicorn
+from indice_ann import update_index_file
+from formato_galeria import load_users, write_gallery  # Arquivo binário da galeria (substitui o encodings.pkl).
+from notificacao import publish_gallery_change
+from compactacao import compact_encodings, MAX_PROTOTYPES
 
 # Cria a instância da aplicação FastAPI.
 app = FastAPI()
@@ -180,36 +183,49 @@ async def upload(
         </html>
         """, status_code=400)
 
-    # Carrega o arquivo pickle com os usuários já cadastrados ou cria um novo.
+    # Carrega o arquivo da galeria com os usuários já cadastrados ou cria um novo.
+    # Na primeira execução, importa os usuários do encodings.pkl antigo, se existir.
     #pickle_file = 'encodings.pkl'
     pickle_file = os.path.join(os.getcwd(), 'encodings.pkl')
+    gallery_file = os.path.join(os.getcwd(), 'encodings.gal')
 
-    if os.path.exists(pickle_file):
-        with open(pickle_file, 'rb') as f:
-            data = pickle.load(f)  # Carrega os dados existentes.
+    if os.path.exists(gallery_file):
+        data = {'users': load_users(gallery_file)}  # Carrega os dados existentes.
+    elif os.path.exists(pickle_file):
+        data = {'users': load_users(pickle_file)}
     else:
         data = {'users': []}  # Se não existir, cria uma nova estrutura para armazenar os usuários.
 
     # Verifica se o usuário já existe no sistema.
     user_exists = False
-    for user in data['users']:
+    for user_index, user in enumerate(data['users']):
         if user['name'] == name:  # Se o usuário já existe, adiciona as novas codificações.
-            user['encodings'].extend(user_encodings)
+            # Mantém no máximo MAX_PROTOTYPES codificações representativas por usuário.
+            user['encodings'] = compact_encodings(list(user['encodings']) + user_encodings, MAX_PROTOTYPES)
             user_exists = True
             break
 
     # Se o usuário não existir, cria um novo registro.
     if not user_exists:
+        user_index = len(data['users'])
         data['users'].append({
             'name': name,
             'audio': audio.filename,
-            'encodings': user_encodings,
+            'encodings': compact_encodings(user_encodings, MAX_PROTOTYPES),
             'item': item  # Associa o GPIO selecionado ao usuário.
         })
 
-    # Salva os dados atualizados no arquivo pickle.
-    with open(pickle_file, 'wb') as f:
-        pickle.dump(data, f)
+    # Insere as novas codificações no índice IVF usado pelos reconhecedores em galerias grandes
+    # (só um acréscimo no diário do índice; o k-means roda de novo só quando necessário).
+    # O índice é gravado antes da galeria para já estar pronto quando os reconhecedores recarregarem.
+    index_file = os.path.join(os.getcwd(), 'encodings_ivf.npz')
+    update_index_file(index_file, data['users'], user_index)
+
+    # Salva os dados atualizados no arquivo binário da galeria.
+    write_gallery(gallery_file, data['users'])
+
+    # Avisa os reconhecedores em execução para recarregarem a galeria na hora.
+    publish_gallery_change(name, gallery_file)
 
     # Redireciona o usuário para a página inicial após o cadastro.
     #return RedirectResponse(url="/", status_code=303)
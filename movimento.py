@@ -0,0 +1,97 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : movimento.py                                   #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : só rodar o HOG quando há movimento na imagem   #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# movimento.py                                               #
+# -----------------------------------------------------------#
+# O frame é reduzido para 'width' pixels de largura, convertido para cinza e
+# comparado com um fundo médio (cv2.accumulateWeighted). Se a fração de
+# pixels que mudaram passar de min_area, há movimento e a detecção roda.
+# Sem movimento, o HOG só roda a cada keepalive_seconds (pessoa parada na
+# porta). A máscara de movimento e o retângulo que envolve as mudanças
+# ficam disponíveis para a detecção olhar só a região alterada.
+
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, width=160, threshold=25, min_area=0.002, alpha=0.05, keepalive_seconds=5.0, padding=0.15):
+        self.width = width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.alpha = alpha
+        self.keepalive_seconds = keepalive_seconds
+        self.padding = padding
+        self.stats = {'frames': 0, 'motion': 0, 'keepalive': 0, 'skipped': 0}
+        self._background = None
+        self._last_detection = 0.0
+
+    # Analisa o frame (BGR, tamanho original). Retorna um dicionário com:
+    #   'motion' : houve movimento
+    #   'detect' : a detecção deve rodar neste frame (movimento ou keep-alive)
+    #   'mask'   : máscara de movimento reduzida (uint8, 0/255)
+    #   'region' : (top, right, bottom, left) das mudanças no frame original, ou None para o frame todo
+    def update(self, frame, now=None):
+        now = time.time() if now is None else now
+        height, width = frame.shape[:2]
+        scale = self.width / float(width)
+        small = cv2.resize(frame, (self.width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0).astype(np.float32)
+        self.stats['frames'] += 1
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.copy()
+            self._last_detection = now
+            return {'motion': True, 'detect': True, 'mask': np.full(gray.shape, 255, np.uint8), 'region': None}
+
+        difference = cv2.absdiff(gray, self._background)
+        cv2.accumulateWeighted(gray, self._background, self.alpha)
+        mask = (difference > self.threshold).astype(np.uint8) * 255
+        motion = cv2.countNonZero(mask) >= self.min_area * mask.size
+
+        if motion:
+            self.stats['motion'] += 1
+            self._last_detection = now
+            return {'motion': True, 'detect': True, 'mask': mask, 'region': self._region(mask, scale, width, height)}
+        if now - self._last_detection >= self.keepalive_seconds:
+            self.stats['keepalive'] += 1
+            self._last_detection = now
+            return {'motion': False, 'detect': True, 'mask': mask, 'region': None}
+        self.stats['skipped'] += 1
+        return {'motion': False, 'detect': False, 'mask': mask, 'region': None}
+
+    # Retângulo (com folga) que envolve os pixels alterados, em coordenadas do frame original.
+    def _region(self, mask, scale, width, height):
+        points = cv2.findNonZero(mask)
+        if points is None:
+            return None
+        x, y, w, h = cv2.boundingRect(points)
+        pad_x, pad_y = int(w * self.padding) + 1, int(h * self.padding) + 1
+        left = max(0, int((x - pad_x) / scale))
+        top = max(0, int((y - pad_y) / scale))
+        right = min(width, int((x + w + pad_x) / scale))
+        bottom = min(height, int((y + h + pad_y) / scale))
+        return (top, right, bottom, left)
+
+
+# Função que recorta a imagem (já redimensionada por 'scale') na região de
+# movimento. Retorna o recorte e o deslocamento (top, left) para devolver as
+# caixas detectadas às coordenadas da imagem inteira.
+def crop_to_region(image, region, scale=1.0):
+    if region is None:
+        return image, (0, 0)
+    top, right, bottom, left = (int(value * scale) for value in region)
+    return image[top:bottom, left:right], (top, left)
+
+
+# Função que devolve as caixas (top, right, bottom, left) detectadas no recorte para a imagem inteira.
+def offset_boxes(boxes, offset):
+    top, left = offset
+    return [(t + top, r + left, b + top, l + left) for (t, r, b, l) in boxes]
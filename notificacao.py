@@ -0,0 +1,166 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : notificacao.py                                 #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : avisar os reconhecedores quando a galeria muda #
+#             (sem ficar consultando o mtime do arquivo)     #
+#                                                            #
+# arquivos desse sistema:                                    #
+# main.py                                                    #
+# rec_facial_fast_v5.py                                      #
+# notificacao.py                                             #
+# -----------------------------------------------------------#
+# Cada reconhecedor abre um socket Unix (datagrama) em NOTIFY_DIR. O main.py,
+# depois de gravar a galeria, manda um evento "gallery_changed" com o nome do
+# usuário para todos os sockets que encontrar nesse diretório.
+# Se o pacote inotify_simple estiver instalado, o reconhecedor também observa
+# o arquivo da galeria pelo inotify (pega alterações feitas por outros
+# programas, como o formato_galeria.py). A consulta ao mtime fica só como
+# rede de segurança, em intervalos longos, fora do loop de captura.
+
+import os
+import json
+import time
+import socket
+import select
+import threading
+
+try:
+    from inotify_simple import INotify, flags  # Opcional: eventos do sistema de arquivos.
+except ImportError:
+    INotify = None
+
+NOTIFY_DIR = '/tmp/rec_facial_galeria'
+DEBOUNCE_SECONDS = 0.02  # Junta o evento do socket e o do inotify da mesma gravação.
+
+
+# Função usada pelo main.py: avisa todos os reconhecedores que a galeria mudou.
+# Sockets de processos que já terminaram são removidos. Nunca levanta exceção.
+def publish_gallery_change(user_name, gallery_file, notify_dir=NOTIFY_DIR):
+    if not os.path.isdir(notify_dir):
+        return 0
+    message = json.dumps({'event': 'gallery_changed', 'user': user_name,
+                          'file': gallery_file, 'time': time.time()}).encode('utf-8')
+    sent = 0
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+        sender.setblocking(False)
+        for entry in os.listdir(notify_dir):
+            if not entry.endswith('.sock'):
+                continue
+            path = os.path.join(notify_dir, entry)
+            try:
+                sender.sendto(message, path)
+                sent += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)  # Ninguém mais escuta nesse socket.
+                except OSError:
+                    pass
+            except OSError as e:
+                print(f"[ERRO] Falha ao notificar {path}: {e}")
+    return sent
+
+
+# Thread que espera eventos de mudança da galeria e chama on_change(usuarios_alterados).
+class GalleryWatcher(threading.Thread):
+    def __init__(self, gallery_file, on_change, notify_dir=NOTIFY_DIR, poll_interval=60):
+        super().__init__(daemon=True)
+        self.gallery_file = os.path.abspath(gallery_file)
+        self.on_change = on_change
+        self.notify_dir = notify_dir
+        self.poll_interval = poll_interval
+        self.socket_path = os.path.join(notify_dir, f'{os.getpid()}-{id(self)}.sock')
+        self.last_mtime = self._mtime()
+        self._stop_event = threading.Event()
+        self._socket = self._open_socket()
+        self._inotify = self._open_inotify()
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.gallery_file)
+        except OSError:
+            return 0.0
+
+    def _open_socket(self):
+        try:
+            os.makedirs(self.notify_dir, exist_ok=True)
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(self.socket_path)
+            receiver.setblocking(False)
+            return receiver
+        except OSError as e:
+            print(f"[ERRO] Socket de notificação indisponível ({e}); usando só inotify/mtime.")
+            return None
+
+    def _open_inotify(self):
+        if INotify is None:
+            return None
+        inotify = INotify()
+        # O main.py grava num arquivo temporário e renomeia (MOVED_TO).
+        inotify.add_watch(os.path.dirname(self.gallery_file), flags.CLOSE_WRITE | flags.MOVED_TO)
+        return inotify
+
+    # Lê tudo o que estiver pendente nos canais e devolve (houve_evento, usuários).
+    def _drain(self, readable):
+        changed = False
+        users = set()
+        if self._socket is not None and self._socket in readable:
+            while True:
+                try:
+                    message = json.loads(self._socket.recv(4096).decode('utf-8'))
+                except BlockingIOError:
+                    break
+                except ValueError:
+                    continue
+                if message.get('event') == 'gallery_changed':
+                    changed = True
+                    users.add(message.get('user'))
+        if self._inotify is not None and self._inotify in readable:
+            name = os.path.basename(self.gallery_file)
+            for event in self._inotify.read(timeout=0):
+                if event.name == name:
+                    changed = True
+        return changed, users
+
+    def run(self):
+        channels = [channel for channel in (self._socket, self._inotify) if channel is not None]
+        last_poll = time.time()
+        while not self._stop_event.is_set():
+            readable = select.select(channels, [], [], 1.0)[0] if channels else []
+            if not channels:
+                self._stop_event.wait(1.0)
+            changed, users = self._drain(readable)
+
+            if changed:
+                time.sleep(DEBOUNCE_SECONDS)
+                more_readable = select.select(channels, [], [], 0)[0]
+                users |= self._drain(more_readable)[1]
+            elif time.time() - last_poll >= self.poll_interval:
+                last_poll = time.time()
+                changed = True  # Rede de segurança: confere o mtime de tempos em tempos.
+            else:
+                continue
+
+            mtime = self._mtime()
+            if mtime == self.last_mtime:
+                continue  # Mesma versão do arquivo que já foi aplicada.
+            self.last_mtime = mtime
+            users.discard(None)
+            try:
+                self.on_change(users)
+            except Exception as e:
+                print(f"[ERRO] Falha ao aplicar mudança da galeria: {e}")
+
+    # Encerra a thread e remove o socket.
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=2)
+        if self._socket is not None:
+            self._socket.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        if self._inotify is not None:
+            self._inotify.close()
@@ -0,0 +1,80 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : quantizacao.py                                 #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : guardar a galeria em float16/int8 para poupar  #
+#             memória no Raspberry Pi 3                      #
+#                                                            #
+# arquivos desse sistema:                                    #
+# galeria.py                                                 #
+# quantizacao.py                                             #
+# -----------------------------------------------------------#
+# int8: cada dimensão d tem um mínimo lo[d] e uma escala s[d], e o valor é
+# reconstruído como x = lo[d] + (código + 128) * s[d]. Com isso a distância
+# aproximada sai direto dos códigos, sem reconstruir a matriz inteira:
+#   |q - x|^2 = |q'|^2 - 2 (q' * s) . código + |s * código|^2
+# onde q' = q - lo - 128 * s.
+# float16: os códigos são os próprios valores em meia precisão.
+
+import numpy as np
+
+QUANTIZATION_MODES = ('float16', 'int8')
+CHUNK_ROWS = 4096  # Linhas convertidas para float32 por vez na primeira passada.
+
+
+# Função que gera os códigos compactos da galeria no modo escolhido.
+def quantize(encodings, mode):
+    encodings = np.asarray(encodings, dtype=np.float32)
+    if mode == 'float16':
+        codes = encodings.astype(np.float16)
+        decoded = codes.astype(np.float32)
+        return {'mode': mode, 'codes': codes, 'code_sq_norms': np.einsum('ij,ij->i', decoded, decoded)}
+
+    if mode == 'int8':
+        if len(encodings):
+            low = encodings.min(axis=0)
+            scale = (encodings.max(axis=0) - low) / 255.0
+        else:
+            low = np.zeros(encodings.shape[1], dtype=np.float32)
+            scale = np.zeros(encodings.shape[1], dtype=np.float32)
+        scale[scale == 0] = 1.0  # Dimensão constante: qualquer escala serve.
+        codes = np.clip(np.rint((encodings - low) / scale) - 128, -128, 127).astype(np.int8)
+        scaled = codes.astype(np.float32) * scale
+        return {
+            'mode': mode,
+            'codes': codes,
+            'low': low.astype(np.float32),
+            'scale': scale.astype(np.float32),
+            'code_sq_norms': np.einsum('ij,ij->i', scaled, scaled),
+        }
+
+    raise ValueError(f"Modo de quantização inválido: {mode} (use {QUANTIZATION_MODES})")
+
+
+# Função que calcula as distâncias aproximadas (ao quadrado) entre os rostos e os códigos.
+# Com 'rows', só essas linhas dos códigos são comparadas (colunas na mesma ordem).
+def approximate_sq_distances(quantized, queries, rows=None):
+    queries = np.asarray(queries, dtype=np.float32)
+    if quantized['mode'] == 'int8':
+        queries = queries - quantized['low'] - 128.0 * quantized['scale']
+        weights = queries * quantized['scale']
+    else:
+        weights = queries
+
+    codes = quantized['codes'] if rows is None else quantized['codes'][rows]
+    code_sq_norms = quantized['code_sq_norms'] if rows is None else quantized['code_sq_norms'][rows]
+    products = np.empty((len(queries), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), CHUNK_ROWS):
+        chunk = codes[start:start + CHUNK_ROWS].astype(np.float32)
+        products[:, start:start + CHUNK_ROWS] = weights @ chunk.T
+
+    sq = np.einsum('ij,ij->i', queries, queries)[:, None] + code_sq_norms[None, :]
+    sq -= 2.0 * products
+    np.maximum(sq, 0.0, out=sq)
+    return sq
+
+
+# Função que devolve os bytes ocupados pelos códigos e parâmetros de quantização.
+def quantized_nbytes(quantized):
+    return sum(value.nbytes for value in quantized.values() if isinstance(value, np.ndarray))
@@ -0,0 +1,126 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : rastreador.py                                  #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : rastrear rostos entre frames para não gerar a  #
+#             codificação de quem já foi identificado        #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# rastreador.py                                              #
+# -----------------------------------------------------------#
+# Cada caixa detectada é associada a uma trilha (track) pela maior
+# sobreposição (IoU) com a caixa da trilha no frame anterior. A trilha
+# guarda a identidade do último reconhecimento, inclusive "Unknown"
+# (resultado negativo em cache). O face_encodings só roda para:
+#   - trilhas novas;
+#   - trilhas identificadas, a cada reverify_every frames;
+#   - trilhas desconhecidas, a cada reverify_unknown frames.
+# Uma trilha que fica max_misses frames sem caixa é encerrada (rosto perdido)
+# e, se a pessoa voltar, ganha uma trilha nova e é codificada de novo.
+# Um frame sem nenhum rosto encerra todas as trilhas, e uma trilha sem caixa
+# há mais de max_age segundos (pelo instante da captura) também é encerrada.
+# Assim quem chega depois de a porta ficar vazia nunca herda a identidade (e o
+# acionamento do GPIO) de quem saiu, mesmo parando no mesmo lugar.
+
+import itertools
+import time
+
+
+# Função que calcula a sobreposição (IoU) entre duas caixas (top, right, bottom, left).
+def box_iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, reverify_every=15, reverify_unknown=3, max_misses=5, max_age=2.0):
+        self.iou_threshold = iou_threshold
+        self.reverify_every = reverify_every
+        self.reverify_unknown = reverify_unknown
+        self.max_misses = max_misses
+        self.max_age = max_age
+        self.tracks = {}  # id -> dados da trilha
+        self.stats = {'faces': 0, 'encoded': 0, 'reused': 0, 'tracks_created': 0, 'tracks_lost': 0}
+        self._ids = itertools.count(1)
+
+    # Associa as caixas do frame às trilhas. Retorna, para cada caixa,
+    # (id da trilha, precisa_codificar). 'now' é o instante da captura do frame.
+    def update(self, boxes, now=None):
+        now = time.time() if now is None else now
+        if not boxes:
+            self.reset()  # Ninguém na imagem: as próximas caixas são de pessoas novas.
+        for track_id in [track_id for track_id, track in self.tracks.items() if now - track['seen_at'] > self.max_age]:
+            del self.tracks[track_id]
+            self.stats['tracks_lost'] += 1
+
+        pairs = sorted(((box_iou(track['box'], box), track_id, index)
+                        for track_id, track in self.tracks.items()
+                        for index, box in enumerate(boxes)), reverse=True)
+        assigned = {}
+        used_tracks = set()
+        for iou, track_id, index in pairs:
+            if iou < self.iou_threshold:
+                break
+            if track_id in used_tracks or index in assigned:
+                continue
+            assigned[index] = track_id
+            used_tracks.add(track_id)
+
+        # Trilhas sem caixa neste frame.
+        for track_id in list(self.tracks):
+            if track_id not in used_tracks:
+                self.tracks[track_id]['misses'] += 1
+                if self.tracks[track_id]['misses'] > self.max_misses:
+                    del self.tracks[track_id]
+                    self.stats['tracks_lost'] += 1
+
+        results = []
+        for index, box in enumerate(boxes):
+            track_id = assigned.get(index)
+            if track_id is None:
+                track_id = next(self._ids)
+                self.tracks[track_id] = {'box': box, 'result': None, 'age': 0, 'misses': 0, 'seen_at': now}
+                self.stats['tracks_created'] += 1
+            track = self.tracks[track_id]
+            track['box'] = box
+            track['misses'] = 0
+            track['seen_at'] = now
+            track['age'] += 1
+            results.append((track_id, self._needs_encoding(track)))
+
+        self.stats['faces'] += len(boxes)
+        self.stats['encoded'] += sum(needs for _, needs in results)
+        self.stats['reused'] += sum(not needs for _, needs in results)
+        return results
+
+    # Encerra todas as trilhas.
+    def reset(self):
+        self.stats['tracks_lost'] += len(self.tracks)
+        self.tracks.clear()
+
+    def _needs_encoding(self, track):
+        if track['result'] is None:
+            return True
+        interval = self.reverify_every if track['result'][0] is not None else self.reverify_unknown
+        return track['age'] - track['verified_at'] >= interval
+
+    # Guarda o resultado do reconhecimento (usuário, distância, autorizado) na trilha.
+    def assign(self, track_id, result):
+        track = self.tracks.get(track_id)
+        if track is not None:
+            track['result'] = result
+            track['verified_at'] = track['age']
+
+    # Último resultado da trilha; (None, inf, False) se ainda não foi reconhecida.
+    def result(self, track_id):
+        track = self.tracks.get(track_id)
+        if track is None or track['result'] is None:
+            return (None, float('inf'), False)
+        return track['result']
@@ -21,12 +21,13 @@
 #kill -9 <proc>
 #kill -9 2439
 import face_recognition
-import pickle
+from formato_galeria import load_users, resolve_gallery_file
 import cv2
 import os
 import subprocess
 import threading
-from queue import Queue, Empty
+from queue import Empty
+from fila_frames import FrameChannel
 
 gpio_lock = threading.Lock()  # Lock para sincronizar o acesso ao GPIO
 
@@ -42,11 +43,9 @@ def play_audio(audio_path):
         #subprocess.run(['mpg123', audio_path], check=True)
         subprocess.run(['mpg123', audio_path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-# Função para carregar as codificações faciais do arquivo pickle
-def load_encodings(pickle_file):
-    with open(pickle_file, 'rb') as f:
-        data = pickle.load(f)
-    return data['users']
+# Função para carregar as codificações faciais do arquivo da galeria (binário ou pickle)
+def load_encodings(gallery_file):
+    return load_users(gallery_file)
 
 # Função para reconhecimento facial (codificação e comparação)
 # Função para reconhecimento facial (codificação e comparação)
@@ -123,7 +122,7 @@ def detect_faces(encodings_file, frame_skip=10, resize_scale=0.7, forget_frames=
         print("Nenhum usuário cadastrado no arquivo de codificações.")
         return
 
-    face_queue = Queue()
+    face_queue = FrameChannel(maxsize=2, policy='drop_oldest', max_age_ms=1500)  # Fila limitada, descarta frames velhos
     played_audios = set()
     frames_without_recognition = [0]  # Usar lista para rastrear frames sem reconhecimento
 
@@ -173,8 +172,9 @@ def detect_faces(encodings_file, frame_skip=10, resize_scale=0.7, forget_frames=
     video_capture.release()
     #cv2.destroyAllWindows() ##### cometar para reduzir custo computacional
 
-# Caminho para o arquivo pickle com as codificações faciais
-encodings_file = '/home/felipe/encodings.pkl'
+# Caminho para o arquivo binário com as codificações faciais (gerado pelo main.py)
+# Sem o .gal, cai no encodings.pkl ao lado (formato_galeria.resolve_gallery_file).
+encodings_file = resolve_gallery_file('/home/felipe/encodings.gal')
 
 # Inicia a detecção e reconhecimento facial
 detect_faces(encodings_file, frame_skip=20, resize_scale=0.5, forget_frames=1, model_detection = "hog")
@@ -22,13 +22,16 @@
 #kill -9 2439
 
 import face_recognition
-import pickle
 import cv2
 import os
 import subprocess
 import threading
-from queue import Queue, Empty
+from queue import Empty
 import time  # Biblioteca para medir o tempo
+from formato_galeria import resolve_gallery_file
+from galeria import load_gallery, match_faces
+from captura import FrameGrabber
+from fila_frames import FrameChannel
 
 
 # Lock para sincronizar o acesso ao GPIO. Isso impede que duas threads tentem ativar o GPIO ao mesmo tempo.
@@ -53,15 +56,13 @@ def play_audio(audio_path):
 
 
 
-# Função que carrega as codificações faciais dos usuários salvas em um arquivo pickle.
-def load_encodings(pickle_file):
-    with open(pickle_file, 'rb') as f:
-        data = pickle.load(f)  # Carrega o arquivo pickle com os dados dos usuários.
-    return data['users']  # Retorna as codificações faciais dos usuários.
+# Função que carrega a galeria do arquivo binário gerado pelo main.py (mapeado em memória).
+def load_encodings(gallery_file, index_file=None):
+    return load_gallery(gallery_file, index_file=index_file, keep_lists=False)  # Retorna a galeria dos usuários.
 
 # Função que realiza o reconhecimento facial.
 # Utiliza uma fila (queue) para processar os frames capturados pela webcam.
-def recognize_faces(face_queue, users, played_audios, frames_without_recognition, forget_frames):
+def recognize_faces(face_queue, gallery, played_audios, frames_without_recognition, forget_frames):
     first_detection = False  # Flag para identificar a primeira detecção
     if not first_detection:  # Checa se é a primeira detecção
         first_detection = True
@@ -86,17 +87,12 @@ def recognize_faces(face_queue, users, played_audios, frames_without_recognition
         current_frame_names = set()  # Um conjunto para rastrear os nomes das pessoas reconhecidas no frame atual.
 
         # Compara as codificações faciais encontradas com as dos usuários cadastrados.
-        for encoding in encodings:
-            name = "Unknown"  # Se não for encontrada uma correspondência, o nome será "Unknown".
-            for user in users:
-                matches = face_recognition.compare_faces(user['encodings'], encoding, tolerance=0.5)
-                # compará novo rosto com as codificações dos rostos cadastrados.
-                # Compara essas codificações geradas com as codificações previamente armazenadas para verificar
-                # se existe uma correspondência
-
-                if True in matches:
-                    name = user['name']  # Nome do usuário reconhecido.
-                    break
+        # Todos os rostos do frame são comparados com a galeria inteira numa única operação.
+        matches = match_faces(gallery, encodings, tolerance=0.5)
+
+        for user, distance in matches:
+            # Se não for encontrada uma correspondência, o nome será "Unknown".
+            name = user['name'] if user is not None else "Unknown"
 
             if name != "Unknown":  # Se um rosto foi reconhecido...
                 print(f"Pessoa reconhecida: {name}")
@@ -107,7 +103,6 @@ def recognize_faces(face_queue, users, played_audios, frames_without_recognition
 
                 # Toca o áudio e ativa o GPIO apenas uma vez por nome reconhecido.
                 if name not in played_audios:
-                    user = next(user for user in users if user['name'] == name)
                     audio_path = os.path.join('/home/felipe/static/audio', user['audio'])
                     #audio_path = "/home/felipe/static/audio/audio_walner.wav"
 
@@ -138,46 +133,43 @@ def recognize_faces(face_queue, users, played_audios, frames_without_recognition
         face_queue.task_done()  # Indica que o processamento do frame foi concluído.
 
 # Função que captura os frames da webcam e detecta rostos.
-def detect_faces(encodings_file, frame_skip=10, resize_scale=0.7, forget_frames=28, model_detection="hog"):
+def detect_faces(encodings_file, frame_skip=10, resize_scale=0.7, forget_frames=28, model_detection="hog", index_file=None):
     first_detection = False  # Flag para identificar a primeira detecção
 
     # Carrega as codificações faciais dos usuários cadastrados.
-    users = load_encodings(encodings_file)
+    gallery = load_encodings(encodings_file, index_file)
     print("[INFO] Carregando codificações faciais dos usuários cadastrados...")
 
-    if not users:  # Se não houver usuários cadastrados, encerra a função.
+    if not gallery['users']:  # Se não houver usuários cadastrados, encerra a função.
         print("Nenhum usuário cadastrado no arquivo de codificações.")
         return
 
-    # Fila de processamento dos frames.
-    face_queue = Queue()
+    # Fila de processamento dos frames (limitada; descarta frames com mais de 1,5 s).
+    face_queue = FrameChannel(maxsize=2, policy='drop_oldest', max_age_ms=1500)
     played_audios = set()  # Armazena os nomes dos usuários que já tiveram seu áudio tocado.
     frames_without_recognition = [0]  # Contador de frames sem reconhecimento.
 
     # Inicia uma thread para o reconhecimento facial em paralelo à captura de frames.
-    recognize_thread = threading.Thread(target=recognize_faces, args=(face_queue, users, played_audios, frames_without_recognition, forget_frames))
+    recognize_thread = threading.Thread(target=recognize_faces, args=(face_queue, gallery, played_audios, frames_without_recognition, forget_frames))
     recognize_thread.start()
 
     # Abertura da webcam.
     video_capture = cv2.VideoCapture(0)
-    frame_count = 0
 
     if not video_capture.isOpened():  # Verifica se a webcam foi aberta corretamente.
         print("Falha ao abrir a webcam.")
         return
 
+    # Thread de captura: só grab() nos frames pulados; decodifica quando pedimos um frame.
+    grabber = FrameGrabber(video_capture, frame_skip)
+    grabber.start()
+
     # Loop de captura de frames da webcam.
     while True:
-        ret, frame = video_capture.read()  # Captura um frame.
+        ret, frame, captured_at = grabber.read()  # Pega o frame mais recente.
         if not ret:
-            print("Falha ao capturar frame da webcam.")
             break
 
-        if frame_count % frame_skip != 0:  # Pula frames para economizar processamento.
-            frame_count += 1
-            continue
-
-        frame_count += 1
         small_frame = cv2.resize(frame, (0, 0), fx=resize_scale, fy=resize_scale)  # Redimensiona o frame.
         rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)  # Converte o frame para RGB.
 
@@ -195,7 +187,7 @@ def detect_faces(encodings_file, frame_skip=10, resize_scale=0.7, forget_frames=
             played_audios.clear()  # Esquece todos os nomes, permitindo que sejam acionados novamente.
 
         if boxes:  # Se forem detectadas faces, coloca o frame na fila.
-            face_queue.put((small_frame, boxes, resize_scale))
+            face_queue.put((small_frame, boxes, resize_scale), captured_at)
             #Quando um rosto é detectado ele é enviado para a fila face_queue para o reconhecimento facial.
 
         # Desenha um retângulo ao redor de cada face detectada.
@@ -211,10 +203,14 @@ def detect_faces(encodings_file, frame_skip=10, resize_scale=0.7, forget_frames=
     face_queue.join()  # Aguarda todas as tarefas na fila serem concluídas.
     recognize_thread.join()  # Aguarda a finalização da thread de reconhecimento.
 
+    grabber.stop()  # Encerra a thread de captura.
     video_capture.release()  # Libera a câmera.
 
-# Caminho para o arquivo pickle com as codificações faciais.
-encodings_file = '/home/felipe/encodings.pkl'
+# Caminho para o arquivo binário com as codificações faciais (gerado pelo main.py).
+# Sem o .gal, cai no encodings.pkl ao lado (formato_galeria.resolve_gallery_file).
+encodings_file = resolve_gallery_file('/home/felipe/encodings.gal')
+# Índice IVF mantido pelo main.py (usado só em galerias grandes, ver galeria.py).
+index_file = '/home/felipe/encodings_ivf.npz'
 
 # Inicia a detecção e reconhecimento facial.
-detect_faces(encodings_file, frame_skip=20, resize_scale=0.5, forget_frames=28, model_detection="hog")
+detect_faces(encodings_file, frame_skip=20, resize_scale=0.5, forget_frames=28, model_detection="hog", index_file=index_file)
@@ -23,17 +23,32 @@
 #kill -9 2439
 
 import face_recognition
-import pickle
 import cv2
 import os
 import subprocess
 import threading
-from queue import Queue, Empty
+from queue import Empty
 import time
-
-# Lock para sincronizar o acesso ao GPIO e ao carregamento de codificações.
+from formato_galeria import resolve_gallery_file
+from galeria import load_gallery, partition_gallery, match_faces_for_door
+from notificacao import GalleryWatcher
+from cache_identidades import IdentityCache
+from captura import FrameGrabber
+from fila_frames import FairChannel
+from movimento import MotionGate, crop_to_region, offset_boxes
+from rastreador import FaceTracker
+from regiao_interesse import DetectionROI
+from configuracao_camera import open_camera
+from controle_adaptativo import AdaptiveController
+from deteccao import HaarHogDetector, TiledHogDetector, DetectorPool
+from codificacao import CHIP_SIZE, ChipEncoder, extract_face_chips, encode_face_chips, upscale_boxes
+from reconhecimento_paralelo import RecognitionPool, UNKNOWN_RESULT
+
+# Lock para sincronizar o acesso ao GPIO.
 gpio_lock = threading.Lock()
-encodings_lock = threading.Lock()  # Lock para sincronizar o acesso à variável 'users'
+# A galeria não usa lock: ela fica em gallery_ref[0] e nunca é alterada depois
+# de publicada. Uma recarga monta a galeria nova por fora e troca a referência
+# de uma vez; o reconhecimento em andamento continua com a versão que já pegou.
 
 # Função responsável por ativar um GPIO específico.
 def activate_gpio(item):
@@ -45,57 +60,70 @@ def play_audio(audio_path):
     if os.path.exists(audio_path):
         subprocess.run(['/usr/bin/mpg123', audio_path], check=True)
 
-# Função que carrega as codificações faciais dos usuários salvas em um arquivo pickle.
-def load_encodings(pickle_file):
-    with encodings_lock:  # Garantir que o acesso seja controlado ao carregar as codificações.
-        with open(pickle_file, 'rb') as f:
-            data = pickle.load(f)
-    return data['users']
-
-# Função que realiza o reconhecimento facial.
-def recognize_faces(face_queue, users, played_audios, frames_without_recognition, forget_frames):
-    first_detection = False
-    while True:
-        try:
-            frame_data = face_queue.get(timeout=1)
-            if frame_data is None:
-                break
-        except Empty:
-            continue
-
-        frame, boxes, resize_scale = frame_data
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        encodings = face_recognition.face_encodings(rgb_frame, boxes)
-        current_frame_names = set()
-
-        for encoding in encodings:
-            name = "Unknown"
-            with encodings_lock:  # Garantir que o acesso ao 'users' seja sincronizado.
-                for user in users:
-                    matches = face_recognition.compare_faces(user['encodings'], encoding, tolerance=0.5)
-                    if True in matches:
-                        name = user['name']
-                        break
-
-            if name != "Unknown":
-                print(f"Pessoa reconhecida: {name}")
+# Função que carrega a galeria do arquivo binário gerado pelo main.py (mapeado em memória)
+# e monta uma partição por câmera: só os usuários das portas (GPIO) dela são procurados primeiro.
+# door_groups: {câmera: door_items}; door_items None procura todos os usuários.
+# quantization ('float16'/'int8'): a busca usa códigos compactos e a matriz float32
+# fica só no arquivo mapeado (ver galeria.py).
+def load_encodings(gallery_file, index_file=None, door_groups=None, quantization=None):
+    gallery = load_gallery(gallery_file, index_file=index_file, quantization=quantization, keep_lists=False)
+    return {source: partition_gallery(gallery, door_items) for source, door_items in (door_groups or {None: None}).items()}
+
+# Função que realiza o reconhecimento facial dos frames de todas as câmeras.
+# 'sources' ({nome: fonte}) guarda o estado de cada câmera: rastreador, controlador,
+# áudios já tocados, GPIO e métricas. A fila atende as câmeras em rodízio.
+# Com 'pool' (RecognitionPool), o encoding e a busca rodam nos processos do pool;
+# esta thread só distribui os frames e trata os resultados na ordem dos frames.
+# Com fallback=True, quem não é desta porta ainda é identificado na galeria completa
+# (só para o log "conhecido, mas sem acesso"); nunca aciona o GPIO.
+def recognize_faces(face_queue, gallery_ref, sources, forget_frames, identity_cache=None, pool=None, encoder=None, fallback=False):
+    encoding_stats = {'faces': 0, 'total_ms': 0.0, 'max_ms': 0.0}  # Tempo de encoding por rosto.
+
+    # Aplica os resultados de um frame (na ordem de captura) e aciona áudio/GPIO.
+    def finish_frame(context, results, encode_ms):
+        source_name, tracks, pending, matches, captured_at, started = context
+        source = sources[source_name]
+        tracker, controller = source['tracker'], source['controller']
+        played_audios, frames_without_recognition = source['played_audios'], source['frames_without_recognition']
+        for index, result in zip(pending, results):
+            matches[index] = result
+            if tracker is not None:
+                tracker.assign(tracks[index][0], result)
+        encoding_stats['faces'] += len(encode_ms)
+        encoding_stats['total_ms'] += sum(encode_ms)
+        encoding_stats['max_ms'] = max([encoding_stats['max_ms']] + encode_ms)
+
+        if controller is not None:
+            controller.record_recognition(time.time() - started, captured_at)
+        source['stats']['recognized_frames'] += 1
+        source['stats']['end_to_end_ms'] += (time.time() - captured_at) * 1000.0
+
+        for user, distance, authorized in matches:
+            name = user['name'] if user is not None else "Unknown"
+
+            if name != "Unknown" and not authorized:
+                print(f"[{source_name}] Pessoa conhecida, mas sem acesso nesta porta: {name}")
+            elif name != "Unknown":
+                print(f"[{source_name}] Pessoa reconhecida: {name}")
                 #current_frame_names.add(name)#walnert
                 #frames_without_recognition[0] = 0#walnert
                 frames_without_recognition[0] += 1
 
                 if name not in played_audios:
-                    user = next(user for user in users if user['name'] == name)
                     audio_path = os.path.join('/home/felipe/static/audio', user['audio'])
 
                     audio_thread = threading.Thread(target=play_audio, args=(audio_path,))
                     audio_thread.daemon = True
                     audio_thread.start()
 
-                    gpio_thread = threading.Thread(target=activate_gpio, args=(user['item'],))
+                    # A câmera pode ter a sua própria porta ('gpio'); senão vale a do usuário.
+                    gpio_item = source['gpio'] if source['gpio'] is not None else user['item']
+                    gpio_thread = threading.Thread(target=activate_gpio, args=(gpio_item,))
                     gpio_thread.daemon = True
                     gpio_thread.start()
 
                     played_audios.add(name)
+                    source['stats']['activations'] += 1
 
                 #else:
                     #frames_without_recognition[0] = 0
@@ -108,8 +136,78 @@ def recognize_faces(face_queue, users, played_audios, frames_without_recognition
             #print(f"Passaram-se {forget_frames} frames sem reconhecer nenhum nome, resetando estado.")
             frames_without_recognition[0] = 0
             played_audios.clear()
+            print(f"[INFO] {source_name}: {format_source_stats(source)}")
+            if identity_cache is not None:
+                print(f"[INFO] Cache de identidades: acertos={identity_cache.hit_rate():.0%} {identity_cache.stats}")
+            print(f"[INFO] Fila de rostos ({source_name}): profundidade={face_queue.qsize(source_name)} {face_queue.channels[source_name].stats}")
+            if tracker is not None:
+                print(f"[INFO] Rastreador ({source_name}): {tracker.stats}")
+            if encoding_stats['faces']:
+                print(f"[INFO] Encoding: {encoding_stats['faces']} rostos, média {encoding_stats['total_ms'] / encoding_stats['faces']:.1f} ms/rosto, máx. {encoding_stats['max_ms']:.1f} ms")
+            if pool is not None:
+                print(f"[INFO] Pool de reconhecimento: {pool.workers} processos {pool.stats}")
+
+    while True:
+        if pool is not None:
+            for context, results, encode_ms in pool.completed():
+                finish_frame(context, results, encode_ms)
+        try:
+            # Com o pool, a espera é curta para recolher os resultados que forem chegando.
+            item = face_queue.get(timeout=0.02 if pool is not None else 1)
+        except Empty:
+            continue
+        if item is None:
+            break  # Todas as câmeras terminaram e a fila esvaziou.
 
-        face_queue.task_done()
+        source_name, (chips, boxes, resize_scale, captured_at) = item
+        tracker = sources[source_name]['tracker']
+        started = time.time()
+        if not boxes:
+            # Frame inteiro sem rostos (só vem com o rastreador): encerra as trilhas desta câmera.
+            if tracker is not None:
+                tracker.update([], captured_at)
+            face_queue.task_done(source_name)
+            continue
+
+        # Com o rastreador, só os rostos novos ou com reverificação vencida são codificados;
+        # os demais reaproveitam a identidade (ou o "Unknown") da sua trilha.
+        tracks = tracker.update(boxes, captured_at) if tracker is not None else [(None, True)] * len(boxes)
+        pending = [index for index, (_, needs_encoding) in enumerate(tracks) if needs_encoding]
+        matches = [tracker.result(track_id) if track_id is not None else None for track_id, _ in tracks]
+        context = (source_name, tracks, pending, matches, captured_at, started)
+
+        if pool is not None:
+            # Os recortes vão para a memória compartilhada; o resultado volta em pool.completed().
+            pool.submit(chips[pending], context, group=source_name)
+        elif pending:
+            # O encoding usa direto os recortes (RGB) feitos na detecção; com o
+            # encoder, os rostos do frame são codificados em paralelo.
+            encode = encoder.encode if encoder is not None else encode_face_chips
+            encodings, encode_ms = encode(chips[pending])
+            # Compara os rostos do frame com a partição das portas desta câmera numa única operação.
+            # Rosto sem codificação fica "Unknown" na sua posição.
+            gallery = gallery_ref[0][source_name]  # Versão atual da galeria, usada até o fim deste frame.
+            encoded = [position for position, encoding in enumerate(encodings) if encoding is not None]
+            results = [UNKNOWN_RESULT] * len(encodings)
+            for position, result in zip(encoded, match_faces_for_door(gallery, [encodings[position] for position in encoded], tolerance=0.5, fallback=fallback, cache=identity_cache)):
+                results[position] = result
+            finish_frame(context, results, encode_ms)
+        else:
+            finish_frame(context, [], [])
+
+        face_queue.task_done(source_name)
+
+    if pool is not None:
+        for context, results, encode_ms in pool.completed(wait=True):
+            finish_frame(context, results, encode_ms)
+
+# Função que resume as métricas de uma câmera.
+def format_source_stats(source):
+    stats = source['stats']
+    latency = stats['end_to_end_ms'] / stats['recognized_frames'] if stats['recognized_frames'] else 0.0
+    return (f"frames={stats['frames']} detecções={stats['detections']} rostos={stats['faces']} "
+            f"reconhecidos={stats['recognized_frames']} acionamentos={stats['activations']} "
+            f"latência média={latency:.0f}ms")
 
 # Função para verificar se o arquivo de codificações foi modificado.
 #def check_for_new_encodings(encodings_file, last_mtime):
@@ -119,74 +217,266 @@ def recognize_faces(face_queue, users, played_audios, frames_without_recognition
 #        subprocess.run(['sudo', 'systemctl', 'restart', 'rec_facial.service'])  # Reinicia o serviço
 #    return current_mtime
 
-def check_for_new_encodings(encodings_file, last_mtime, users):
-    current_mtime = os.path.getmtime(encodings_file)  # Verifica a última modificação do arquivo
-    if current_mtime > last_mtime:
-        print("[INFO] Atualizando codificações faciais.")
-        users.clear()  # Limpa as codificações antigas
-        new_users = load_encodings(encodings_file)  # Carrega novas codificações
-        users.extend(new_users)  # Atualiza a lista com as novas codificações
-    return current_mtime
-
-# Função que captura os frames da webcam e detecta rostos.
-def detect_faces(encodings_file, check_interval=60, resize_scale=0.7, forget_frames=50, model_detection="hog"):
-    users = load_encodings(encodings_file)
-    last_mtime = os.path.getmtime(encodings_file)
-    print("[INFO] Codificações faciais carregadas inicialmente.")
-
-    frame_skip = 10  # Número de frames a serem pulados #walner
-
-    face_queue = Queue()
-    played_audios = set()
-    frames_without_recognition = [0]
-
-    recognize_thread = threading.Thread(target=recognize_faces, args=(face_queue, users, played_audios, frames_without_recognition, forget_frames))
-    recognize_thread.start()
-
-    video_capture = cv2.VideoCapture(0)
+# Função chamada pelo GalleryWatcher (notificacao.py) quando o main.py avisa que a galeria mudou.
+def reload_gallery(encodings_file, gallery_ref, index_file=None, changed_users=(), door_groups=None, quantization=None):
+    print(f"[INFO] Atualizando codificações faciais. Usuários alterados: {', '.join(sorted(changed_users)) or '?'}")
+    try:
+        new_gallery = load_encodings(encodings_file, index_file, door_groups, quantization)  # Monta as novas partições por fora
+    except (OSError, ValueError) as e:
+        print(f"[ERRO] Falha ao recarregar codificações, mantendo as atuais: {e}")
+        return
+    gallery_ref[0] = new_gallery  # Publica as novas partições com uma única troca de referência
+
+# Função que captura os frames de uma câmera e detecta rostos (uma thread por câmera).
+# Cada câmera tem o seu grabber, filtro de movimento, região de interesse, detector
+# e controlador; os recortes dos rostos vão para a fila compartilhada com o nome da câmera.
+def run_camera(source, face_queue, motion_gate=True, capture_fps=15, adaptive=True, target_latency_ms=600, cpu_budget=0.8, coarse_to_fine=False, detection_workers=0):
+    name = source['name']
+    frame_skip, resize_scale, model_detection = source['frame_skip'], source['resize_scale'], source['model_detection']
+    stats, played_audios, frames_without_recognition = source['stats'], source['played_audios'], source['frames_without_recognition']
+
+    if source['target_face_fraction']:
+        # Pede à câmera o menor modo que ainda detecta o rosto mínimo; o resize só fica se o driver recusar.
+        video_capture, granted, resize_scale = open_camera(source['device'], source['target_face_fraction'], capture_fps)
+        print(f"[INFO] {name}: modo da câmera {granted}, resize_scale={resize_scale:.2f}")
+    else:
+        video_capture = cv2.VideoCapture(source['device'])
     if not video_capture.isOpened():
-        print("Falha ao abrir a webcam.")
+        print(f"Falha ao abrir a webcam {name} ({source['device']}).")
         return
 
-    last_check_time = time.time()
-    frame_count = 0  # Contador de frames #walner
+    # Controlador adaptativo: frame_skip e resize_scale seguem a latência medida, sem reiniciar.
+    controller = None
+    if adaptive:
+        # Sem scale_bounds, o resize_scale configurado é o teto (o controlador só reduz e devolve).
+        scale_bounds = source['scale_bounds'] or (min(0.3, resize_scale), resize_scale)
+        controller = AdaptiveController(frame_skip, resize_scale, target_latency_ms, cpu_budget,
+                                        skip_bounds=source['skip_bounds'], scale_bounds=scale_bounds)
+        frame_skip, resize_scale = controller.frame_skip, controller.resize_scale
+    source['controller'] = controller  # O reconhecimento alimenta o controlador desta câmera.
+
+    # Thread de captura: só grab() nos frames pulados; decodifica quando pedimos um frame.
+    grabber = FrameGrabber(video_capture, frame_skip)
+    grabber.start()
+
+    # Filtro de movimento: o HOG só roda quando algo muda na imagem (ou no keep-alive).
+    motion = MotionGate() if motion_gate else None
+    # Região de interesse da câmera: paredes e teto nem chegam ao resize/HOG.
+    roi = DetectionROI(source['roi_polygons']) if source['roi_polygons'] else None
+    # model_detection="haar_hog": o Haar propõe regiões e o HOG só confirma os recortes.
+    # model_detection="tiled_hog": HOG em blocos sobrepostos, um processo por núcleo (câmeras 1080p+).
+    # Com detection_workers, cada frame vai para um de N processos detectores e as
+    # caixas voltam na ordem da captura; este loop só prepara os frames.
+    detector = None
+    detection_pool = DetectorPool(detection_workers, model_detection) if detection_workers else None
+    if detection_pool is None and model_detection == "haar_hog":
+        detector = HaarHogDetector()
+    elif detection_pool is None and model_detection == "tiled_hog":
+        detector = TiledHogDetector()
+
+    # Trata as caixas de um frame (sempre na ordem da captura) e entrega ao reconhecimento.
+    def handle_detection(context, boxes):
+        nonlocal resize_scale
+        frame, small_frame, offset, frame_scale, captured_at, started, full_frame = context
+        boxes = offset_boxes(boxes, offset)
+        if roi is not None:
+            boxes = roi.filter_boxes(boxes, frame_scale)  # Descarta rostos fora dos polígonos.
+        stats['detections'] += 1
+        stats['faces'] += len(boxes)
+
+        # Só um frame inteiro sem rostos mostra que a porta está vazia. Com o HOG só
+        # na região com movimento, quem está parado fica fora do recorte e não pode
+        # ser "esquecido" (a saudação e o GPIO repetiriam a cada movimento).
+        if not boxes and full_frame:
+            frames_without_recognition[0] = 35
+            #print('[ACTION] Permitir que usuários sejam reconhecidos novamente')
+            played_audios.clear()  # Esquece todos os nomes, permitindo que sejam acionados novamente.
+            if source['tracker'] is not None:
+                # Avisa o reconhecimento (na ordem dos frames) para encerrar as trilhas: quem
+                # chegar depois não herda a identidade de quem saiu.
+                face_queue.put(name, (extract_face_chips(small_frame, []), [], frame_scale, captured_at), captured_at)
+
+        # O reconhecimento recebe só os recortes dos rostos (RGB, CHIP_SIZE) e as caixas.
+        if boxes and coarse_to_fine:
+            # Detecta no frame reduzido, mas recorta os rostos do frame original.
+            boxes = upscale_boxes(boxes, frame_scale, frame.shape)
+            face_queue.put(name, (extract_face_chips(frame, boxes), boxes, 1.0, captured_at), captured_at)
+        elif boxes:
+            face_queue.put(name, (extract_face_chips(small_frame, boxes), boxes, frame_scale, captured_at), captured_at)
+
+        if controller is not None:
+            controller.record_detection(time.time() - started, face_queue.qsize(name))
+            if controller.update():
+                grabber.frame_skip = controller.frame_skip
+                resize_scale = controller.resize_scale
 
     while True:
-        ret, frame = video_capture.read()
+        ret, frame, captured_at = grabber.read()  # Sempre o frame mais recente.
         if not ret:
-            print("Falha ao capturar frame da webcam.")
             break
-        frame_count += 1  # Incrementar contador de frames # walner
-        # Verifica se deve pular este frame # walner
-        if frame_count % frame_skip != 0:# walner
-            continue  # Pula o processamento deste frame# walner
-
-        small_frame = cv2.resize(frame, (0, 0), fx=resize_scale, fy=resize_scale)
-        rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        boxes = face_recognition.face_locations(rgb_frame, model=model_detection)
-
-        if not boxes:
-            frames_without_recognition[0] = 35
-            #print('[ACTION] Permitir que usuários sejam reconhecidos novamente')
-            played_audios.clear()  # Esquece todos os nomes, permitindo que sejam acionados novamente.
+        stats['frames'] += 1
+
+        if detection_pool is not None:
+            # Entrega as caixas que ficaram prontas, mesmo que este frame seja
+            # descartado abaixo (sem movimento): a saudação não espera o próximo envio.
+            for ready_context, boxes in detection_pool.completed():
+                handle_detection(ready_context, boxes)
+
+        if roi is not None:
+            frame = roi.crop(frame)  # Daqui em diante tudo fica em coordenadas do recorte.
+
+        started = time.time()
+        region = None
+        if motion is not None:
+            motion_result = motion.update(frame, captured_at)
+            if not motion_result['detect']:
+                continue  # Corredor parado: não roda o HOG neste frame.
+            region = motion_result['region']
+
+        small_frame = frame if resize_scale == 1.0 else cv2.resize(frame, (0, 0), fx=resize_scale, fy=resize_scale)
+        # Só a região com movimento passa pelo HOG; as caixas voltam para o frame inteiro.
+        detect_area, offset = crop_to_region(small_frame, region, resize_scale)
+        rgb_frame = cv2.cvtColor(detect_area, cv2.COLOR_BGR2RGB)
+        context = (frame, small_frame, offset, resize_scale, captured_at, started, region is None)
+
+        if detection_pool is not None:
+            # Pool cheio: espera o frame mais antigo terminar antes de mandar outro.
+            while not detection_pool.has_capacity():
+                for ready_context, boxes in detection_pool.completed(block=True):
+                    handle_detection(ready_context, boxes)
+            detection_pool.submit(rgb_frame, context)
+        elif detector is not None:
+            handle_detection(context, detector.detect(rgb_frame))
+        else:
+            handle_detection(context, face_recognition.face_locations(rgb_frame, model=model_detection))
+
+    if detection_pool is not None:
+        for ready_context, boxes in detection_pool.completed(wait_all=True):
+            handle_detection(ready_context, boxes)
+        print(f"[INFO] {name}: pool de detecção {detection_pool.workers} processos {detection_pool.stats}")
+        detection_pool.close()
+    if roi is not None:
+        print(f"[INFO] {name}: região de interesse {roi.stats}")
+    if detector is not None:
+        print(f"[INFO] {name}: detector {model_detection} {detector.stats}")
+        detector.close()
+    if controller is not None:
+        print(f"[INFO] {name}: ajustes do controlador {controller.adjustment_count} (frame_skip={controller.frame_skip}, resize_scale={controller.resize_scale})")
+    grabber.stop()
+    video_capture.release()
 
-        if boxes:
-            face_queue.put((small_frame, boxes, resize_scale))
+# Função que captura os frames das câmeras e detecta e reconhece os rostos.
+# Sem 'sources' há uma única câmera (dispositivo 0) com as configurações abaixo.
+# Cada fonte é um dict com 'name', 'device' e, opcionalmente, as configurações próprias
+# ('frame_skip', 'resize_scale', 'door_items', 'gpio', 'roi_polygons',
+# 'target_face_fraction', 'model_detection'); o que faltar vem dos parâmetros.
+# Todas as câmeras usam a mesma galeria, o mesmo cache e o mesmo reconhecimento.
+def detect_faces(encodings_file, check_interval=60, resize_scale=0.7, forget_frames=50, model_detection="hog", index_file=None, door_items=None, cache_size=8, cache_policy='lru', queue_size=2, queue_policy='drop_oldest', max_frame_age_ms=1500, motion_gate=True, track_faces=True, roi_polygons=None, target_face_fraction=None, capture_fps=15, adaptive=True, target_latency_ms=600, cpu_budget=0.8, skip_bounds=(2, 30), scale_bounds=None, coarse_to_fine=False, recognition_workers=0, detection_workers=0, encoding_workers=0, sources=None, quantization=None, fallback=False):
+    # frame_skip: número de frames a serem pulados #walner
+    defaults = {'device': 0, 'frame_skip': 10, 'resize_scale': resize_scale, 'door_items': door_items, 'gpio': None,
+                'roi_polygons': roi_polygons, 'target_face_fraction': target_face_fraction, 'model_detection': model_detection,
+                'skip_bounds': skip_bounds, 'scale_bounds': scale_bounds}
+    sources = [{**defaults, 'name': f"camera{i}", **source} for i, source in enumerate(sources or [{}])]
+    names = [source['name'] for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Nomes de câmera repetidos: {names}")
+    for source in sources:
+        # Estado de cada câmera, usado pela detecção e pelo reconhecimento.
+        source.update(played_audios=set(), frames_without_recognition=[0], controller=None,
+                      # Rastreador de rostos: evita codificar de novo quem já foi identificado.
+                      tracker=FaceTracker() if track_faces else None,
+                      stats={'frames': 0, 'detections': 0, 'faces': 0, 'recognized_frames': 0, 'activations': 0, 'end_to_end_ms': 0.0})
+    sources = {source['name']: source for source in sources}
+    door_groups = {name: source['door_items'] for name, source in sources.items()}
+
+    gallery_ref = [load_encodings(encodings_file, index_file, door_groups, quantization)]
+    print("[INFO] Codificações faciais carregadas inicialmente.")
 
-        # Verificação independente da modificação do arquivo de codificações.
-        current_time = time.time()
-        if current_time - last_check_time >= check_interval:
-            #last_mtime = check_for_new_encodings(encodings_file, last_mtime)
-            last_mtime = check_for_new_encodings(encodings_file, last_mtime,users)
-            last_check_time = current_time
+    # Recarrega a galeria por evento (socket/inotify); check_interval é só a rede de segurança.
+    watcher = GalleryWatcher(encodings_file, lambda users: reload_gallery(encodings_file, gallery_ref, index_file, users, door_groups, quantization), poll_interval=check_interval)
+    watcher.start()
+
+    # Uma fila limitada por câmera (frames atrasados são descartados em vez de acumular),
+    # atendidas em rodízio: uma câmera movimentada não atrasa as outras.
+    face_queue = FairChannel(sources, queue_size, queue_policy, max_frame_age_ms)
+    # Pessoas vistas recentemente são testadas antes da busca completa (cache_size=0 desliga).
+    identity_cache = IdentityCache(cache_size, cache_policy) if cache_size else None
+
+    # Pool de processos para encoding + busca (0 = tudo na thread de reconhecimento).
+    pool = None
+    if recognition_workers:
+        pool = RecognitionPool(recognition_workers, encodings_file, index_file, cache_size=cache_size, cache_policy=cache_policy,
+                               slot_bytes=8 * CHIP_SIZE * CHIP_SIZE * 3,  # Slot para até 8 rostos por frame.
+                               door_groups=door_groups, quantization=quantization, fallback=fallback)
+        identity_cache = None  # Cada worker do pool tem o seu.
+    # Sem o pool, os rostos de um mesmo frame podem ser codificados em paralelo (processos persistentes).
+    encoder = ChipEncoder(encoding_workers) if encoding_workers and pool is None else None
+
+    recognize_thread = threading.Thread(target=recognize_faces, args=(face_queue, gallery_ref, sources, forget_frames, identity_cache, pool, encoder, fallback))
+    recognize_thread.start()
 
-    face_queue.put(None)
+    # Uma thread de captura + detecção por câmera.
+    camera_threads = [threading.Thread(target=run_camera, args=(source, face_queue),
+                                       kwargs=dict(motion_gate=motion_gate, capture_fps=capture_fps, adaptive=adaptive,
+                                                   target_latency_ms=target_latency_ms, cpu_budget=cpu_budget,
+                                                   coarse_to_fine=coarse_to_fine, detection_workers=detection_workers))
+                      for source in sources.values()]
+    for camera_thread in camera_threads:
+        camera_thread.start()
+    for camera_thread in camera_threads:
+        camera_thread.join()
+
+    face_queue.close()
     face_queue.join()
     recognize_thread.join()
-    video_capture.release()
-
-# Caminho para o arquivo pickle com as codificações faciais.
-encodings_file = '/home/felipe/encodings.pkl'
+    for name, source in sources.items():
+        print(f"[INFO] {name}: {format_source_stats(source)}")
+    if pool is not None:
+        pool.close()
+    if encoder is not None:
+        encoder.close()
+    watcher.stop()
+
+# Caminho para o arquivo binário com as codificações faciais (gerado pelo main.py).
+# Sem o .gal, cai no encodings.pkl ao lado (formato_galeria.resolve_gallery_file).
+encodings_file = resolve_gallery_file('/home/felipe/encodings.gal')
+# Índice IVF mantido pelo main.py (usado só em galerias grandes, ver galeria.py).
+index_file = '/home/felipe/encodings_ivf.npz'
+# Portas (GPIO 'item') atendidas por esta câmera; None procura todos os usuários.
+door_items = None  # ex.: ['21']
+# Polígonos da região de interesse desta câmera, pontos (x, y) de 0 a 1; None usa o frame todo.
+roi_polygons = None  # ex.: [[(0.1, 0.3), (0.9, 0.3), (0.9, 1.0), (0.1, 1.0)]]
+# Largura do menor rosto esperado em relação à imagem (0.125 = 1/8); escolhe o modo da câmera.
+# Com None a câmera abre no modo padrão e cada frame é reduzido por resize_scale.
+target_face_fraction = 0.125
+# Detector: "hog", "cnn", "haar_hog" (Haar propõe, HOG confirma) ou "tiled_hog" (blocos em paralelo;
+# para câmeras 1080p+, use com target_face_fraction = None e resize_scale = 1.0).
+model_detection = "hog"
+# Processos de reconhecimento (encoding + busca); 0 mantém tudo numa thread. Ex.: 3 num Pi de 4 núcleos.
+recognition_workers = 0
+# Processos para codificar em paralelo os rostos de um mesmo frame (grupos), quando recognition_workers = 0.
+# Com recognition_workers, os rostos de um frame já são divididos entre os workers do pool.
+encoding_workers = 0
+# Processos de detecção (HOG); 0 detecta no próprio loop. Não se aplica ao "tiled_hog".
+detection_workers = 0
+# Detecta no frame reduzido e gera as codificações a partir do frame em resolução cheia.
+# Só faz diferença quando a câmera entrega mais resolução que a detecção (resize_scale < 1.0),
+# ex.: target_face_fraction = None com a câmera no modo padrão.
+coarse_to_fine = True
+# Limites do controlador adaptativo: (mínimo, máximo) de frame_skip e de resize_scale.
+# Com scale_bounds = None, o resize_scale da câmera é o máximo e o mínimo é 0.3.
+skip_bounds = (2, 30)
+scale_bounds = None  # ex.: (0.3, 0.7)
+# Galeria em 'float16' ou 'int8' (menos memória no Pi 3; o float32 fica só no encodings.gal
+# mapeado e é lido para reavaliar os melhores candidatos). None usa float32.
+quantization = None
+# Várias câmeras no mesmo reconhecimento: uma fonte por câmera, cada uma com as suas
+# configurações (as que faltarem vêm das variáveis acima). None usa só a câmera 0.
+# 'gpio' aciona a porta da câmera em vez do 'item' do usuário reconhecido.
+sources = None  # ex.: [{'name': 'entrada', 'device': 0, 'door_items': ['21'], 'gpio': 21},
+                #       {'name': 'garagem', 'device': 2, 'door_items': ['20'], 'gpio': 20, 'frame_skip': 5, 'resize_scale': 0.4}]
 
 # Inicia a detecção e reconhecimento facial.
-detect_faces(encodings_file, check_interval=60, resize_scale=0.5, forget_frames=50, model_detection="hog")
+# Protegido pelo __main__ porque os processos do detector "tiled_hog" importam este arquivo.
+if __name__ == "__main__":
+    detect_faces(encodings_file, check_interval=60, resize_scale=0.5, forget_frames=50, model_detection=model_detection, index_file=index_file, door_items=door_items, roi_polygons=roi_polygons, target_face_fraction=target_face_fraction, skip_bounds=skip_bounds, scale_bounds=scale_bounds, coarse_to_fine=coarse_to_fine, recognition_workers=recognition_workers, detection_workers=detection_workers, encoding_workers=encoding_workers, sources=sources, quantization=quantization)
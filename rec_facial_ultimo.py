@@ -20,7 +20,7 @@
 # digite tecla "q" para sair
 
 import face_recognition
-import pickle
+from formato_galeria import load_users, resolve_gallery_file
 import cv2
 import pygame
 import os
@@ -58,17 +58,15 @@ def play_audio(audio_path):
         print(f"Erro ao tocar o áudio: {e}")
 
 
-# Função para carregar as codificações faciais do arquivo pickle
-def load_encodings(pickle_file):
+# Função para carregar as codificações faciais do arquivo da galeria (binário ou pickle)
+def load_encodings(gallery_file):
     try:
-        with open(pickle_file, 'rb') as f:
-            data = pickle.load(f)  # Carrega o arquivo pickle
-        return data['users']  # Retorna a lista de usuários
+        return load_users(gallery_file)  # Retorna a lista de usuários
     except FileNotFoundError:
-        print(f"Arquivo {pickle_file} não encontrado.")
+        print(f"Arquivo {gallery_file} não encontrado.")
         return []
     except Exception as e:
-        print(f"Erro ao carregar o arquivo pickle: {e}")
+        print(f"Erro ao carregar o arquivo da galeria: {e}")
         return []
 
 
@@ -151,8 +149,9 @@ def recognize_faces_from_webcam(encodings_file, frame_skip=10, resize_scale=0.7)
     #cv2.destroyAllWindows()
 
 
-# Caminho para o arquivo pickle com as codificações faciais
-encodings_file = '/home/felipe/encodings.pkl'
+# Caminho para o arquivo binário com as codificações faciais (gerado pelo main.py)
+# Sem o .gal, cai no encodings.pkl ao lado (formato_galeria.resolve_gallery_file).
+encodings_file = resolve_gallery_file('/home/felipe/encodings.gal')
 
 # Inicia o reconhecimento facial, ignorando frames e ajustando a resolução
 recognize_faces_from_webcam(encodings_file, frame_skip=20, resize_scale=0.5)
@@ -0,0 +1,290 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : reconhecimento_paralelo.py                     #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : reconhecimento (encoding + busca) num pool de  #
+#             processos, com os recortes dos rostos em       #
+#             memória compartilhada                          #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# reconhecimento_paralelo.py                                 #
+# -----------------------------------------------------------#
+# A thread recognize_faces usa no máximo um núcleo e ainda disputa o GIL com
+# a detecção. Aqui o encoding e a busca rodam em 'workers' processos.
+#
+# Os recortes dos rostos (face chips, ver codificacao.py) não passam pela fila
+# em pickle: o processo principal copia o array de recortes de cada frame
+# para um slot de um anel em multiprocessing.shared_memory e manda só o
+# descritor (slot, shape, dtype). Cada rosto vira uma tarefa separada, então
+# os rostos de um mesmo frame são codificados em paralelo por workers
+# diferentes. O worker lê o seu recorte direto da memória compartilhada e
+# devolve (seq, rosto, resultado); o slot só volta a ser usado quando todos os
+# rostos do frame terminaram. Sem slot livre o frame é descartado (contado em
+# stats['dropped']), como a fila limitada faz.
+#
+# Os resultados chegam fora de ordem e são reordenados pelo número de
+# sequência: completed() só entrega um frame depois de todos os anteriores.
+#
+# Um erro num rosto não derruba o worker: o rosto volta como "Unknown" (como o
+# DetectorPool faz com um frame), senão o frame nunca completaria e o
+# ReorderBuffer seguraria todos os seguintes.
+# Um worker que morre (segfault no dlib, OOM) também não trava a ordem: cada
+# worker anota em memória compartilhada o rosto que está processando; quando
+# completed() encontra um worker morto, esse rosto volta como "Unknown" e o
+# worker é recriado. Rostos sem resposta depois de task_timeout segundos
+# (o worker morreu antes de anotar a tarefa) também voltam como "Unknown".
+#
+# Os workers são criados com 'forkserver' (ou 'spawn'), e não com fork: quando
+# o pool sobe, o processo principal já tem threads rodando (watcher, captura).
+#
+# Cada worker carrega a própria galeria (o encodings.gal é mapeado em memória,
+# então as páginas são compartilhadas pelo sistema) e tem o próprio
+# GalleryWatcher e IdentityCache.
+#
+# Várias câmeras podem usar o mesmo pool: door_groups diz as portas (GPIO
+# 'item') de cada câmera, o worker monta uma partição da galeria por câmera e
+# cada frame é enviado com o nome da sua câmera (submit(..., group=nome)).
+
+import time
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from queue import Empty
+import numpy as np
+from fila_frames import ReorderBuffer
+
+UNKNOWN_RESULT = (None, float('inf'), False)  # Mesmo "não reconhecido" do FaceTracker.result.
+POLL_INTERVAL = 1.0  # Segundos entre verificações dos workers enquanto completed(wait=True) espera.
+
+
+class SharedFrameRing:
+    def __init__(self, slots, slot_bytes):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.name = self.shm.name
+        self.free = list(range(slots))
+
+    # Copia o array para um slot livre. Retorna o descritor ou None se não há slot.
+    def write(self, array):
+        if not self.free or array.nbytes > self.slot_bytes:
+            return None
+        slot = self.free.pop(0)
+        view = np.ndarray(array.shape, array.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        view[...] = array
+        return (self.name, slot, self.slot_bytes, array.shape, array.dtype.str)
+
+    def release(self, slot):
+        self.free.append(slot)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Abre no worker a memória compartilhada criada pelo processo principal
+# (só o processo principal apaga o anel, em close()).
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: registra no resource_tracker do processo principal.
+        return shared_memory.SharedMemory(name=name)
+
+
+# Visão (sem cópia) do array guardado no slot descrito por 'descriptor'.
+def read_slot(shm, descriptor):
+    _, slot, slot_bytes, shape, dtype = descriptor
+    return np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=slot * slot_bytes)
+
+
+# Loop de cada processo do pool. current[2 * worker_id:2 * worker_id + 2] guarda
+# (frame, rosto) da tarefa em andamento, ou -1 quando o worker está livre.
+def _recognition_worker(worker_id, current, tasks, results, gallery_file, index_file, door_groups, tolerance, cache_size, cache_policy, quantization, fallback):
+    # Importados aqui: o processo principal não precisa do dlib só para criar o pool.
+    from galeria import load_gallery, partition_gallery, match_faces_for_door
+    from cache_identidades import IdentityCache
+    from codificacao import encode_face_chips
+    from notificacao import GalleryWatcher
+
+    # Uma partição da mesma galeria para cada grupo de portas.
+    def load():
+        gallery = load_gallery(gallery_file, index_file=index_file, quantization=quantization, keep_lists=False)
+        return {group: partition_gallery(gallery, door_items) for group, door_items in door_groups.items()}
+
+    def reload(users):
+        try:
+            gallery_ref[0] = load()
+        except (OSError, ValueError) as e:
+            print(f"[ERRO] Worker: falha ao recarregar codificações, mantendo as atuais: {e}")
+
+    gallery_ref = [load()]
+    watcher = GalleryWatcher(gallery_file, reload)
+    watcher.start()
+    identity_cache = IdentityCache(cache_size, cache_policy) if cache_size else None
+    attached = {}  # nome do anel -> SharedMemory aberta neste processo
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, descriptor, index, group = task
+        current[2 * worker_id], current[2 * worker_id + 1] = seq, index
+        result, encode_ms, chips = UNKNOWN_RESULT, 0.0, None
+        try:
+            name = descriptor[0]
+            if name not in attached:
+                for old in list(attached):
+                    attached.pop(old).close()  # O anel foi recriado; o antigo não volta mais.
+                attached[name] = _attach(name)
+            chips = read_slot(attached[name], descriptor)
+            encodings, times_ms = encode_face_chips(chips[index:index + 1])
+            encode_ms = times_ms[0]
+            if encodings[0] is not None:  # Sem encoding (landmarks não encontrados): fica "Unknown".
+                result = match_faces_for_door(gallery_ref[0][group], encodings, tolerance=tolerance,
+                                              fallback=fallback, cache=identity_cache)[0]
+        except Exception as e:
+            print(f"[ERRO] Worker: falha no reconhecimento de um rosto (frame {seq}): {e!r}")
+        finally:
+            chips = None  # Libera a visão antes de o slot ser reaproveitado.
+        results.put((seq, index, result, encode_ms))
+        current[2 * worker_id] = -1
+
+    watcher.stop()
+    for shm in attached.values():
+        shm.close()
+
+
+class RecognitionPool:
+    # door_groups: {grupo: portas}; sem ele há um único grupo (None) com door_items.
+    def __init__(self, workers, gallery_file, index_file=None, door_items=None, tolerance=0.5,
+                 cache_size=8, cache_policy='lru', slots_per_worker=2, slot_bytes=0, door_groups=None, quantization=None, fallback=False,
+                 task_timeout=30.0):
+        self.workers = workers
+        self.task_timeout = task_timeout
+        self.slots = max(2, workers * slots_per_worker)
+        self.slot_bytes = slot_bytes  # Tamanho mínimo do slot (ex.: recortes de vários rostos).
+        self.ring = None
+        self.stats = {'submitted': 0, 'completed': 0, 'dropped': 0, 'restarted_workers': 0, 'lost_faces': 0}
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self._context = context
+        # O resource_tracker precisa existir antes dos workers, para ser herdado por eles;
+        # senão cada worker teria o seu e apagaria o anel ao terminar.
+        resource_tracker.ensure_running()
+        door_groups = door_groups if door_groups is not None else {None: door_items}
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._current = context.Array('q', [-1] * (2 * workers), lock=False)
+        self._worker_args = (self._tasks, self._results, gallery_file, index_file, door_groups,
+                             tolerance, cache_size, cache_policy, quantization, fallback)
+        self._processes = [self._start_worker(worker_id) for worker_id in range(workers)]
+        self._order = ReorderBuffer()
+        self._frames = {}        # seq -> [contexto, slot, resultados por rosto, tempos, rostos faltando]
+        self._pending = {}       # (seq, rosto) -> instante do envio, para os rostos ainda sem resultado
+        self._in_flight = 0      # frames com rostos ainda em processamento
+
+    def _start_worker(self, worker_id):
+        self._current[2 * worker_id] = -1
+        process = self._context.Process(target=_recognition_worker, daemon=True,
+                                        args=(worker_id, self._current) + self._worker_args)
+        process.start()
+        return process
+
+    # O anel é criado no primeiro envio (slot = maior entre slot_bytes e o array) e
+    # recriado maior quando chega um array maior sem nada em processamento.
+    def _ring_for(self, array):
+        if self.ring is not None and array.nbytes <= self.ring.slot_bytes:
+            return self.ring
+        if self.ring is not None and self._in_flight:
+            return None
+        if self.ring is not None:
+            self.ring.close()
+        self.ring = SharedFrameRing(self.slots, max(self.slot_bytes, array.nbytes))
+        return self.ring
+
+    # Envia os recortes (N, S, S, 3) dos rostos a codificar. 'context' volta junto
+    # com o resultado; 'group' escolhe a partição da galeria (a câmera de origem).
+    # Frames sem rostos não vão aos workers, mas passam pela ordem normalmente.
+    def submit(self, chips, context=None, group=None):
+        if len(chips):
+            ring = self._ring_for(chips)
+            descriptor = ring.write(chips) if ring is not None else None
+            if descriptor is None:
+                self.stats['dropped'] += 1
+                return None
+            seq = self._order.reserve()
+            count = len(chips)
+            self._frames[seq] = [context, descriptor[1], [None] * count, [0.0] * count, count]
+            now = time.time()
+            for index in range(count):
+                self._pending[(seq, index)] = now
+                self._tasks.put((seq, descriptor, index, group))
+            self._in_flight += 1
+        else:
+            seq = self._order.reserve()
+            self._order.put(seq, (context, [], []))
+        self.stats['submitted'] += 1
+        return seq
+
+    # Recebe os resultados prontos e devolve, em ordem de frame, uma lista de
+    # (contexto, resultados, tempos de encoding em ms). Com wait=True espera
+    # todos os frames enviados (verificando os workers a cada POLL_INTERVAL).
+    def completed(self, wait=False):
+        while self._in_flight:
+            try:
+                seq, index, match, encode_ms = self._results.get(timeout=POLL_INTERVAL) if wait else self._results.get_nowait()
+            except Empty:
+                self._check_workers()
+                if wait:
+                    continue
+                break
+            self._finish_face(seq, index, match, encode_ms)
+        ready = self._order.pop_ready()
+        self.stats['completed'] += len(ready)
+        return ready
+
+    # Guarda o resultado de um rosto; fecha o frame quando todos os rostos voltaram.
+    # Resultados repetidos (de um rosto já dado como perdido) são ignorados.
+    def _finish_face(self, seq, index, match, encode_ms):
+        if self._pending.pop((seq, index), None) is None:
+            return
+        frame = self._frames[seq]
+        frame[2][index], frame[3][index] = match, encode_ms
+        frame[4] -= 1
+        if frame[4]:
+            return  # Ainda faltam rostos deste frame.
+        context, slot, matches, times_ms, _ = self._frames.pop(seq)
+        self.ring.release(slot)
+        self._in_flight -= 1
+        self._order.put(seq, (context, matches, times_ms))
+
+    # Recria os workers mortos e dá como "Unknown" o rosto que cada um processava
+    # e os rostos sem resposta há mais de task_timeout segundos.
+    def _check_workers(self):
+        for worker_id, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            seq, index = self._current[2 * worker_id], self._current[2 * worker_id + 1]
+            print(f"[ERRO] Worker {worker_id} do reconhecimento terminou (código {process.exitcode}); recriando.")
+            if seq >= 0 and (seq, index) in self._pending:
+                self.stats['lost_faces'] += 1
+                self._finish_face(seq, index, UNKNOWN_RESULT, 0.0)
+            self._processes[worker_id] = self._start_worker(worker_id)
+            self.stats['restarted_workers'] += 1
+
+        deadline = time.time() - self.task_timeout
+        for (seq, index), sent in list(self._pending.items()):
+            if sent < deadline:
+                print(f"[ERRO] Rosto {index} do frame {seq} sem resposta em {self.task_timeout:.0f}s; fica Unknown.")
+                self.stats['lost_faces'] += 1
+                self._finish_face(seq, index, UNKNOWN_RESULT, 0.0)
+
+    # Encerra os workers e libera a memória compartilhada.
+    def close(self):
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+        if self.ring is not None:
+            self.ring.close()
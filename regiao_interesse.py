@@ -0,0 +1,72 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : regiao_interesse.py                            #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : limitar a detecção às áreas da imagem onde     #
+#             pode aparecer um rosto (polígonos por câmera)  #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rec_facial_fast_v5.py                                      #
+# regiao_interesse.py                                        #
+# -----------------------------------------------------------#
+# Cada câmera tem uma lista de polígonos com os pontos (x, y) em coordenadas
+# relativas do frame (0 a 1), então a configuração continua valendo se a
+# resolução da câmera mudar. Exemplo (metade de baixo, sem o teto):
+#     roi_polygons = [[(0.1, 0.3), (0.9, 0.3), (0.9, 1.0), (0.1, 1.0)]]
+# O frame é recortado no retângulo que envolve os polígonos antes do resize e
+# do HOG. Caixas detectadas cujo centro cai fora dos polígonos são descartadas.
+# As caixas podem ser levadas de volta às coordenadas do frame inteiro com
+# to_frame().
+
+import cv2
+import numpy as np
+
+
+class DetectionROI:
+    def __init__(self, polygons):
+        if not polygons:
+            raise ValueError("Informe pelo menos um polígono para a região de interesse.")
+        self.polygons = [np.asarray(polygon, dtype=np.float32).reshape(-1, 2) for polygon in polygons]
+        for polygon in self.polygons:
+            if len(polygon) < 3 or polygon.min() < 0 or polygon.max() > 1:
+                raise ValueError(f"Polígono inválido (mín. 3 pontos, coordenadas de 0 a 1): {polygon.tolist()}")
+        self.stats = {'frames': 0, 'boxes': 0, 'discarded': 0, 'pixel_fraction': 1.0}
+        self._shape = None
+
+    # Prepara o retângulo e os polígonos em pixels para o tamanho do frame (refeito se a resolução mudar).
+    def _prepare(self, shape):
+        if self._shape == shape:
+            return
+        height, width = shape
+        self._pixel_polygons = [(polygon * (width, height)).astype(np.float32) for polygon in self.polygons]
+        points = np.concatenate(self._pixel_polygons)
+        left, top = (int(value) for value in np.floor(points.min(axis=0)))
+        right, bottom = (int(value) for value in np.ceil(points.max(axis=0)))
+        self.rect = (max(0, top), min(width, right), min(height, bottom), max(0, left))
+        self.stats['pixel_fraction'] = round((self.rect[1] - self.rect[3]) * (self.rect[2] - self.rect[0]) / float(width * height), 3)
+        self._shape = shape
+
+    # Recorta o frame (tamanho original) no retângulo dos polígonos.
+    def crop(self, frame):
+        self._prepare(frame.shape[:2])
+        self.stats['frames'] += 1
+        top, right, bottom, left = self.rect
+        return frame[top:bottom, left:right]
+
+    # Leva caixas (top, right, bottom, left) do recorte, reduzido por 'scale', para o frame inteiro.
+    def to_frame(self, boxes, scale=1.0):
+        top, _, _, left = self.rect
+        return [(int(t / scale) + top, int(r / scale) + left, int(b / scale) + top, int(l / scale) + left)
+                for (t, r, b, l) in boxes]
+
+    # Mantém só as caixas (do recorte reduzido) com o centro dentro de algum polígono.
+    def filter_boxes(self, boxes, scale=1.0):
+        kept = []
+        for box, (top, right, bottom, left) in zip(boxes, self.to_frame(boxes, scale)):
+            center = ((left + right) / 2.0, (top + bottom) / 2.0)
+            if any(cv2.pointPolygonTest(polygon, center, False) >= 0 for polygon in self._pixel_polygons):
+                kept.append(box)
+        self.stats['boxes'] += len(boxes)
+        self.stats['discarded'] += len(boxes) - len(kept)
+        return kept
@@ -0,0 +1,113 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : test_fila_frames.py                            #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : testes das filas entre detecção e              #
+#             reconhecimento                                 #
+#                                                            #
+# arquivos desse sistema:                                    #
+# fila_frames.py                                             #
+# test_fila_frames.py                                        #
+# -----------------------------------------------------------#
+#USO
+
+#python -m pytest test_fila_frames.py
+
+import time
+import threading
+from queue import Empty
+import pytest
+from fila_frames import FrameChannel, FairChannel, ReorderBuffer
+
+
+def drain(channel):
+    items = []
+    while True:
+        try:
+            items.append(channel.get(timeout=0))
+        except Empty:
+            return items
+
+
+def test_drop_oldest_mantem_os_mais_novos():
+    channel = FrameChannel(maxsize=2, policy='drop_oldest')
+    assert all(channel.put(frame) for frame in (1, 2, 3))
+    assert drain(channel) == [2, 3]
+    assert channel.stats['dropped_oldest'] == 1
+
+
+def test_drop_newest_recusa_o_que_chega():
+    channel = FrameChannel(maxsize=2, policy='drop_newest')
+    assert channel.put(1) and channel.put(2)
+    assert not channel.put(3)
+    assert drain(channel) == [1, 2]
+    assert channel.stats['dropped_newest'] == 1
+
+
+def test_max_age_descarta_na_entrada_e_na_saida():
+    channel = FrameChannel(maxsize=4, max_age_ms=50)
+    assert not channel.put('velho', captured_at=time.time() - 1.0)
+    channel.put('quase velho', captured_at=time.time() - 0.04)
+    channel.put('novo')
+    time.sleep(0.02)
+    assert drain(channel) == ['novo']
+    assert channel.stats['dropped_stale'] == 2
+
+
+def test_sinal_de_fim_nunca_e_descartado():
+    channel = FrameChannel(maxsize=1, policy='drop_newest', max_age_ms=10)
+    channel.put('frame')
+    channel.put(None, captured_at=time.time() - 1.0)  # Fila cheia e fora do prazo.
+    time.sleep(0.02)
+    assert drain(channel) == [None]
+
+    channel = FrameChannel(maxsize=1, policy='drop_oldest')
+    channel.put(None)
+    assert not channel.put('frame')  # Só o None na fila: descarta o frame que chega.
+    assert drain(channel) == [None]
+    assert channel.stats['dropped_newest'] == 1
+
+
+def test_join_volta_depois_dos_descartes():
+    channel = FrameChannel(maxsize=1, policy='drop_oldest', max_age_ms=10)
+    channel.put(1)
+    channel.put(2)  # Descarta o 1.
+    channel.put(3, captured_at=time.time() - 1.0)  # Descartado por idade.
+    assert channel.get(timeout=0) == 2
+    channel.task_done()
+
+    finished = threading.Event()
+    waiter = threading.Thread(target=lambda: (channel.join(), finished.set()), daemon=True)
+    waiter.start()
+    assert finished.wait(1.0)
+
+
+def test_fair_channel_atende_as_cameras_em_rodizio():
+    channel = FairChannel(['porta', 'garagem'], maxsize=10)
+    for frame in range(5):
+        channel.put('porta', ('porta', frame))
+    channel.put('garagem', ('garagem', 0))
+    channel.put('garagem', ('garagem', 1))
+
+    served = [channel.get(timeout=0)[0] for _ in range(4)]
+    assert served == ['porta', 'garagem', 'porta', 'garagem']
+    assert [channel.get(timeout=0)[0] for _ in range(3)] == ['porta'] * 3
+    with pytest.raises(Empty):
+        channel.get(timeout=0)
+    channel.close()
+    assert channel.get(timeout=0) is None
+
+
+def test_reorder_buffer_entrega_na_ordem_da_captura():
+    buffer = ReorderBuffer()
+    seqs = [buffer.reserve() for _ in range(4)]
+    buffer.put(seqs[2], 'c')
+    buffer.put(seqs[1], 'b')
+    assert buffer.pop_ready() == []  # Falta o primeiro frame.
+    buffer.put(seqs[0], 'a')
+    assert buffer.pop_ready() == ['a', 'b', 'c']
+    assert buffer.pending() == 1
+    buffer.put(seqs[3], 'd')
+    assert buffer.pop_ready() == ['d']
+    assert buffer.pending() == 0
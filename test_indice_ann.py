@@ -0,0 +1,104 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : test_indice_ann.py                             #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : testes do diário do índice IVF                 #
+#                                                            #
+# arquivos desse sistema:                                    #
+# indice_ann.py                                              #
+# test_indice_ann.py                                         #
+# -----------------------------------------------------------#
+#USO
+
+#python -m pytest test_indice_ann.py
+
+import os
+import numpy as np
+import indice_ann
+from indice_ann import LOG_RECORD, load_index, load_summary, log_path, update_index_file
+
+
+def make_users(count, per_user=5, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{'encodings': rng.normal(size=(per_user, 128)).astype(np.float32)} for _ in range(count)]
+
+
+def total(users):
+    return sum(len(user['encodings']) for user in users)
+
+
+def test_cadastro_acrescenta_ao_diario_sem_regravar_o_npz(tmp_path):
+    path = str(tmp_path / 'ivf.npz')
+    users = make_users(200)
+    assert update_index_file(path, users, 0, min_size=None) is not None  # Sem arquivo: índice novo.
+    assert not os.path.exists(log_path(path))
+    saved = os.path.getmtime(path), os.path.getsize(path)
+
+    users.append(make_users(1, per_user=3, seed=1)[0])
+    assert update_index_file(path, users, len(users) - 1, min_size=None) is None
+    users[7] = make_users(1, per_user=2, seed=2)[0]
+    assert update_index_file(path, users, [7], min_size=None) is None
+
+    assert (os.path.getmtime(path), os.path.getsize(path)) == saved
+    # Cada troca grava a remoção do dono e os vetores novos.
+    assert os.path.getsize(log_path(path)) == (1 + 3 + 1 + 2) * LOG_RECORD.itemsize
+
+
+def test_diario_e_reaplicado_na_leitura(tmp_path):
+    path = str(tmp_path / 'ivf.npz')
+    users = make_users(200)
+    update_index_file(path, users, 0, min_size=None)
+    users.append(make_users(1, per_user=3, seed=1)[0])
+    update_index_file(path, users, len(users) - 1, min_size=None)
+    users[7] = make_users(1, per_user=2, seed=2)[0]
+    update_index_file(path, users, 7, min_size=None)
+
+    index = load_index(path)
+    assert index.size == total(users)
+    _, ids = index.search(users[-1]['encodings'], k=1)
+    assert (ids[:, 0] == len(users) - 1).all()
+    _, ids = index.search(users[7]['encodings'], k=1)
+    assert (ids[:, 0] == 7).all()
+    summary = load_summary(path)
+    assert summary['list_sizes'].sum() == total(users)
+    assert len(summary['owner_lists'][7]) == 2
+
+
+def test_registro_cortado_e_ignorado_e_descartado(tmp_path):
+    path = str(tmp_path / 'ivf.npz')
+    users = make_users(200)
+    update_index_file(path, users, 0, min_size=None)
+    users.append(make_users(1, per_user=3, seed=1)[0])
+    update_index_file(path, users, len(users) - 1, min_size=None)
+
+    with open(log_path(path), 'ab') as f:
+        f.write(b'\x01\x00\x00')  # Gravação interrompida no meio de um registro.
+    assert load_index(path).size == total(users)
+
+    users.append(make_users(1, per_user=4, seed=3)[0])
+    assert update_index_file(path, users, len(users) - 1, min_size=None) is None
+    assert os.path.getsize(log_path(path)) % LOG_RECORD.itemsize == 0
+    assert load_index(path).size == total(users)
+
+
+def test_retreina_depois_de_muitos_acrescimos(tmp_path, monkeypatch):
+    path = str(tmp_path / 'ivf.npz')
+    users = make_users(200)
+    update_index_file(path, users, 0, min_size=None)
+    monkeypatch.setattr(indice_ann, 'RETRAIN_ADDITIONS', 5)
+
+    users.append(make_users(1, per_user=3, seed=1)[0])
+    assert update_index_file(path, users, len(users) - 1, min_size=None) is None
+    users.append(make_users(1, per_user=3, seed=2)[0])
+    index = update_index_file(path, users, len(users) - 1, min_size=None)
+    assert index is not None  # 6 acréscimos >= 5: k-means de novo e .npz regravado.
+    assert not os.path.exists(log_path(path))
+    assert load_index(path).added_since_train == 0
+    assert load_index(path).size == total(users)
+
+
+def test_galeria_pequena_nao_mantem_indice(tmp_path):
+    path = str(tmp_path / 'ivf.npz')
+    assert update_index_file(path, make_users(10), 0, min_size=1000) is None
+    assert not os.path.exists(path)
@@ -0,0 +1,48 @@
+# -----------------------------------------------------------#
+# Projeto   : Sistema de reconhecimento facial Rasberry      #
+# File Name : test_rastreador.py                             #
+# Data      : 18/10/2026                                     #
+# Autor(a)s : Walner de Oliveira /                           #
+# Objetivo  : testes do rastreador de rostos                 #
+#                                                            #
+# arquivos desse sistema:                                    #
+# rastreador.py                                              #
+# test_rastreador.py                                         #
+# -----------------------------------------------------------#
+#USO
+
+#python -m pytest test_rastreador.py
+
+from rastreador import FaceTracker, box_iou
+
+PERSON_A = {'name': 'A', 'item': '21'}
+
+
+def test_pessoa_nova_apos_frame_vazio_e_codificada():
+    tracker = FaceTracker()
+    box_a = (100, 200, 200, 100)
+    box_b = (110, 210, 210, 110)  # Mesmo lugar da porta: IoU alto com a caixa de A.
+    assert box_iou(box_a, box_b) >= tracker.iou_threshold
+
+    [(track_a, needs)] = tracker.update([box_a], now=0.0)
+    assert needs
+    tracker.assign(track_a, (PERSON_A, 0.3, True))
+    [(_, needs)] = tracker.update([box_a], now=0.1)
+    assert not needs  # A continua na porta: reaproveita a identidade.
+
+    tracker.update([], now=0.2)  # A saiu: frame sem rostos.
+    [(track_b, needs)] = tracker.update([box_b], now=0.3)
+    assert needs
+    assert track_b != track_a
+    assert tracker.result(track_b)[0] is None
+
+
+def test_trilha_expira_pelo_tempo_da_captura():
+    tracker = FaceTracker(max_age=2.0)
+    box = (100, 200, 200, 100)
+    [(track_a, _)] = tracker.update([box], now=0.0)
+    tracker.assign(track_a, (PERSON_A, 0.3, True))
+    # Sem frame vazio no meio (ex.: descartado pela fila), mas muito tempo depois.
+    [(track_b, needs)] = tracker.update([box], now=5.0)
+    assert needs
+    assert track_b != track_a